@@ -0,0 +1,216 @@
+#! /usr/bin/env python3
+# -*- coding: utf-8 -*-
+__author__ = 'S.H. Hawley'
+
+"""
+Benchmarks for prefigure's config-resolution and OFC hot paths. Runs offline:
+wandb & gradio are replaced by stubs, and everything is written to a temp directory.
+
+Usage:
+    python benchmarks/bench.py -o new.json                   # run all benchmarks
+    python benchmarks/bench.py --quick --filter ofc          # fewer sizes, only names containing 'ofc'
+    python benchmarks/bench.py --compare old.json new.json   # flag regressions (exit code 1 if any)
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import types
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR))
+
+
+class StubRun(object):
+    def __init__(self, config): self.config = config
+
+class StubApi(object):
+    "stands in for wandb.Api"
+    config = {}
+    def run(self, path): return StubRun(dict(StubApi.config))
+
+def install_stubs():
+    "fake wandb & gradio modules, so nothing touches the network or needs those installed"
+    wandb = types.ModuleType('wandb')
+    wandb.Api, wandb.run = StubApi, None
+    wandb.log = lambda *args, **kwargs: None
+    sys.modules['wandb'] = wandb
+    sys.modules['gradio'] = types.ModuleType('gradio')
+
+
+def time_call(fn, repeat=5, min_time=0.2):
+    "best seconds per call of fn(), timeit-style"
+    timer = timeit.Timer(fn)
+    number = 1
+    while timer.timeit(number) < min_time / repeat and number < 1_000_000:
+        number *= 10
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def write_ini(path, n_keys, extra=''):
+    with open(path, 'w') as f:
+        f.write('[DEFAULTS]\n' + extra)
+        for i in range(n_keys):
+            f.write(f"# help for key number {i}\nkey_{i} = {[i, 0.5*i, repr(f'str{i}'), True][i % 4]}\n\n")
+
+def write_json(path, n_keys):
+    with open(path, 'w') as f:
+        json.dump({f"key_{i}": [i, 0.5*i, f'str{i}', True][i % 4] for i in range(n_keys)}, f)
+
+
+def bench_read_config(results, sizes, tmp):
+    from prefigure import read_config
+    for n in sizes:
+        ini, js = os.path.join(tmp, f'read_{n}.ini'), os.path.join(tmp, f'read_{n}.json')
+        write_ini(ini, n)
+        write_json(js, n)
+        results[f'read_config/ini/{n}'] = time_call(lambda: read_config(ini))
+        results[f'read_config/json/{n}'] = time_call(lambda: read_config(js))
+
+
+def bench_get_all_args(results, sizes, tmp):
+    import prefigure.prefigure as pp
+    from prefigure import get_all_args
+    for n in sizes:
+        ini = os.path.join(tmp, f'defaults_{n}.ini')
+        write_ini(ini, n, extra='name = "bench"\n')
+        sys.argv = ['bench', '--config-file', ini, '--key-0', '7']
+        def cold():
+            pp.parser_cache.clear()
+            pp.schema_cache.dir = tempfile.mkdtemp(dir=tmp)   # empty disk cache too
+            get_all_args()
+        results[f'get_all_args/cold/{n}'] = time_call(cold, repeat=3)
+        results[f'get_all_args/warm/{n}'] = time_call(get_all_args)
+
+        StubApi.config = {f"key_{i}": i for i in range(n)}
+        sys.argv = ['bench', '--config-file', ini, '--wandb-config', f'https://wandb.ai/me/bench/runs/run{n}']
+        results[f'get_all_args/wandb_cached/{n}'] = time_call(get_all_args)
+    sys.argv = ['bench']
+
+
+def bench_parse_imports(results, sizes, tmp):
+    import prefigure.prefigure as pp
+    for n in sizes:
+        keys = [f'sub_{i}' for i in range(n)]
+        for i, key in enumerate(keys):
+            write_json(os.path.join(tmp, f'{key}.json'), 50)
+        def run():
+            args = argparse.Namespace(imports=keys, **{key: os.path.join(tmp, f'{key}.json') for key in keys})
+            pp.parse_imports(args)
+        def cold():
+            pp.import_cache.clear()
+            run()
+        results[f'parse_imports/cold/{n}'] = time_call(cold, repeat=3)
+        results[f'parse_imports/warm/{n}'] = time_call(run)
+
+
+def make_ofc(n, tmp, tag='', **kwargs):
+    from prefigure import OFC
+    args = argparse.Namespace(name=os.path.join(tmp, f'ofc{tag}{n}'), **{f'key_{i}': 0.5*i for i in range(n)})
+    return args, OFC(args, use_gui=False, steerables=list(vars(args))[1:], **kwargs)
+
+
+def bench_ofc(results, sizes, tmp):
+    for n in sizes:
+        args, ofc = make_ofc(n, tmp)
+        results[f'ofc/save/{n}'] = time_call(lambda: ofc.save(args))
+        results[f'ofc/update/no_change/{n}'] = time_call(ofc.update)
+        for mode, kwargs in [('watch', {'watch': True}), ('journal', {'journal': True})]:
+            _, watched = make_ofc(n, tmp, tag=mode, **kwargs)
+            watched.update()
+            results[f'ofc/update/no_change/{mode}/{n}'] = time_call(watched.update)
+
+        values = iter(range(10**9))
+        def change():  # rewrite the file with one changed value, then poll
+            vars(args)['key_0'] = -1.0
+            ofc.save(args)
+            vars(args)['key_0'] = float(next(values))
+            ofc.update()
+        results[f'ofc/update/one_change/{n}'] = time_call(change, repeat=3)
+
+        ofc.args_gui_dict.update((key, vars(args)[key]) for key in ofc.steerables)
+        def submit():
+            gui_values = list(ofc.args_gui_dict.values())
+            gui_values[0] = str(float(next(values)))
+            ofc.on_gui_submit(*gui_values)
+        results[f'ofc/on_gui_submit/{n}'] = time_call(submit, repeat=3)
+
+
+def bench_import(results):
+    "cold `import prefigure` in a fresh interpreter, minus the interpreter's own startup"
+    def run(code):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], check=True, cwd=REPO_DIR)
+        return time.perf_counter() - start
+    baseline = min(run('pass') for _ in range(5))
+    results['import_prefigure'] = max(0.0, min(run('import prefigure') for _ in range(5)) - baseline)
+
+
+def run_benchmarks(quick=False, name_filter=None):
+    install_stubs()
+    sizes = [10, 100, 1000] if quick else [10, 100, 1000, 10000]
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['PREFIGURE_CACHE_DIR'] = tmp
+        benches = [('read_config', lambda: bench_read_config(results, sizes, tmp)),
+                   ('get_all_args', lambda: bench_get_all_args(results, sizes, tmp)),
+                   ('parse_imports', lambda: bench_parse_imports(results, [1, 10, 100], tmp)),
+                   ('ofc', lambda: bench_ofc(results, sizes[:3], tmp)),
+                   ('import_prefigure', lambda: bench_import(results))]
+        for name, bench in benches:
+            if name_filter and name_filter not in name: continue
+            print(f"bench: {name}...", file=sys.stderr)
+            with contextlib.redirect_stdout(io.StringIO()):   # OFC prints every change
+                bench()
+    return results
+
+
+def compare(old_file, new_file, threshold=0.2):
+    "prints old vs. new times; returns the names that got slower by more than threshold (a fraction)"
+    with open(old_file) as f: old = json.load(f)['results']
+    with open(new_file) as f: new = json.load(f)['results']
+    regressions = []
+    print(f"{'benchmark':<45} {'old':>12} {'new':>12} {'change':>8}")
+    for name in sorted(set(old) & set(new)):
+        if old[name] <= 0:   # (too fast to time, or a broken file): no ratio to compare
+            print(f"{name:<45} {old[name]*1e6:>10.1f}us {new[name]*1e6:>10.1f}us {'n/a':>8}  (old time isn't positive, not compared)")
+            continue
+        change = (new[name] - old[name]) / old[name]
+        flag = ''
+        if change > threshold:
+            regressions.append(name)
+            flag = '  <-- REGRESSION'
+        print(f"{name:<45} {old[name]*1e6:>10.1f}us {new[name]*1e6:>10.1f}us {change:>+8.0%}{flag}")
+    for name in sorted(set(old) ^ set(new)):
+        print(f"{name:<45} only in {old_file if name in old else new_file}, not compared")
+    return regressions
+
+
+if __name__ == '__main__':
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument('-o', '--output', default='bench.json', help='where to write results (JSON)')
+    p.add_argument('--quick', action='store_true', help='skip the largest sizes')
+    p.add_argument('--filter', default=None, help='only run benchmarks whose name contains this')
+    p.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='compare two result files instead of running')
+    p.add_argument('--threshold', type=float, default=0.2, help='slowdown (fraction) that counts as a regression')
+    opts = p.parse_args()
+
+    if opts.compare:
+        regressions = compare(*opts.compare, threshold=opts.threshold)
+        if regressions: print(f"\n{len(regressions)} regression(s) beyond {opts.threshold:.0%}")
+        sys.exit(1 if regressions else 0)
+
+    results = run_benchmarks(quick=opts.quick, name_filter=opts.filter)
+    meta = {'python': platform.python_version(), 'platform': platform.platform(), 'time': time.time()}
+    with open(opts.output, 'w') as f:
+        json.dump({'meta': meta, 'results': results}, f, indent=1)
+    print(f"Wrote {len(results)} results to {opts.output}")
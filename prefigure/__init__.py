@@ -1,2 +1,6 @@
 from .prefigure import *
-from .ofc import *
\ No newline at end of file
+from .ofc import *
+from .frozen import *
+from .sweep import *
+from .publish import *
+from .compare import *
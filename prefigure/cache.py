@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+__author__ = 'S.H. Hawley'
+
+"""
+Small on-disk cache of JSON-able things (e.g. configs pulled from wandb).
+Entries expire after `ttl` seconds, the number of entries is bounded, writes are
+atomic, and a file lock per key lets one process do the (slow) work while others wait.
+"""
+
+import os
+import re
+import json
+import time
+import zlib
+import tempfile
+import warnings
+from contextlib import contextmanager
+try:
+    import fcntl
+except ImportError:   # not on POSIX: no locking, everybody just does their own fetch
+    fcntl = None
+
+LOCK_FILES = 64   # keys share this many lock files (by hash), so there's a fixed number of them however many keys come & go
+
+CACHE_DIR = os.getenv('PREFIGURE_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'prefigure'))
+
+
+class DiskCache(object):
+    "one JSON file per key in cache_dir/subdir"
+    def __init__(self,
+                 subdir,            # e.g. 'wandb'
+                 cache_dir=None,    # default is CACHE_DIR, i.e. $PREFIGURE_CACHE_DIR or ~/.cache/prefigure
+                 ttl=None,          # seconds after which entries are stale. None = never
+                 max_entries=1000,  # oldest entries get evicted beyond this
+                 ):
+        self.dir = os.path.join(cache_dir or CACHE_DIR, subdir)
+        self.ttl, self.max_entries = ttl, max_entries
+
+    def path(self, key):
+        return os.path.join(self.dir, re.sub(r'[^\w.-]', '_', key) + '.json')
+
+    def get(self, key, ignore_ttl=False):
+        "returns cached value for key, or None if missing or stale"
+        path = self.path(key)
+        try:
+            if (not ignore_ttl) and (self.ttl is not None) and (time.time() - os.path.getmtime(path) > self.ttl):
+                return None
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, value):
+        "atomic write: readers see either the old file or the new one, never half of one"
+        try:
+            os.makedirs(self.dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.dir, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(value, f)
+                os.replace(tmp_path, self.path(key))
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except (OSError, TypeError, ValueError) as e:   # read-only home dir, non-JSON-able value, etc: just don't cache
+            warnings.warn(f"prefigure: could not cache {key} in {self.dir}: {e}")
+            return
+        self.evict()
+
+    def evict(self):
+        "deletes the least-recently-written entries beyond max_entries"
+        try:
+            entries = [e for e in os.scandir(self.dir) if e.name.endswith('.json')]
+        except OSError:
+            return
+        if len(entries) <= self.max_entries: return
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for e in entries[:len(entries) - self.max_entries]:
+            try:
+                os.unlink(e.path)
+            except OSError:
+                pass
+
+    def lock_path(self, key):
+        "the lock file for key. (a few unrelated keys share each one, which just means they sometimes wait for each other)"
+        return os.path.join(self.dir, f".lock-{zlib.crc32(key.encode()) % LOCK_FILES}")
+
+    @contextmanager
+    def lock(self, key):
+        "exclusive lock on key across processes (blocks until available)"
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(self.dir, exist_ok=True)
+        with open(self.lock_path(key), 'w') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
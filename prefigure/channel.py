@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+__author__ = 'S.H. Hawley'
+
+"""
+Shared-memory fan-out of OFC changes to other processes on the same machine.
+
+One process (e.g. local rank 0) owns the OFC file & GUI and publishes changed values
+into a shared-memory segment. All other processes just check a sequence counter
+in that segment: no file I/O, and O(1) when nothing has changed.
+
+Segment layout:  [ seq (uint64) | payload length (uint64) | pickled dict ... ]
+seq is odd while the writer is mid-write (a "seqlock"), so readers can tell when to retry.
+"""
+
+from multiprocessing import shared_memory, resource_tracker
+import pickle
+import struct
+import threading
+import time
+
+HEADER = struct.Struct('QQ')
+_register_lock = threading.Lock()
+
+
+def attach_shared_memory(name):
+    "attach to an existing segment without the resource tracker deleting it when *this* process exits"
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)   # python >= 3.13
+    except TypeError:
+        pass
+    with _register_lock:   # older pythons: keep the segment from being registered at all.
+        register = resource_tracker.register   # (unregistering afterwards would break forked processes, which share one tracker)
+        resource_tracker.register = lambda name, rtype: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+class SharedChannel(object):
+    "seqlock-protected shared-memory dict: one writer (create=True), any number of readers"
+    def __init__(self,
+                 name,           # segment name, should be unique per run, e.g. 'ofc-'+args.name
+                 create=False,   # True for the writer/owner, False for readers
+                 size=65536,     # max bytes of pickled payload
+                 ):
+        self.name, self.create, self.size = name, create, size
+        self.shm, self.last_seq = None, 0
+        if create:
+            try:
+                self.shm = shared_memory.SharedMemory(name=name, create=True, size=HEADER.size + size)
+            except FileExistsError:   # left over from a crashed run
+                stale = attach_shared_memory(name)
+                stale.close()
+                stale.unlink()
+                self.shm = shared_memory.SharedMemory(name=name, create=True, size=HEADER.size + size)
+            HEADER.pack_into(self.shm.buf, 0, 0, 0)
+
+    def attach(self):
+        "readers attach lazily, so they can be started before the owner"
+        if self.shm is None:
+            try:
+                self.shm = attach_shared_memory(self.name)
+            except FileNotFoundError:
+                return False
+        return True
+
+    def publish(self, values):
+        "writer: replace the contents of the channel with dict values"
+        payload = pickle.dumps(values, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(payload) > self.size:
+            raise ValueError(f"SharedChannel: payload of {len(payload)} bytes exceeds channel size {self.size}")
+        buf = self.shm.buf
+        seq = HEADER.unpack_from(buf, 0)[0]
+        HEADER.pack_into(buf, 0, seq + 1, 0)                  # odd = write in progress
+        buf[HEADER.size:HEADER.size + len(payload)] = payload
+        HEADER.pack_into(buf, 0, seq + 2, len(payload))       # even = done
+        self.last_seq = seq + 2
+
+    def read(self, retries=100):
+        "reader: returns the published dict if it's new since the last read, else None"
+        if not self.attach(): return None
+        buf = self.shm.buf
+        for _ in range(retries):
+            seq, length = HEADER.unpack_from(buf, 0)
+            if seq == self.last_seq: return None           # the usual case: nothing new
+            if seq % 2 == 1:                                # writer is busy
+                time.sleep(0)
+                continue
+            payload = bytes(buf[HEADER.size:HEADER.size + length])
+            if HEADER.unpack_from(buf, 0)[0] != seq:        # got overwritten while we were copying
+                continue
+            self.last_seq = seq
+            return pickle.loads(payload)
+        return None
+
+    def close(self):
+        if self.shm is None: return
+        self.shm.close()
+        if self.create: self.shm.unlink()
+        self.shm = None
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+__author__ = 'S.H. Hawley'
+
+"""
+Configs of many wandb runs at once, e.g. to see what differs between the runs of a project:
+
+    table = fetch_wandb_configs('my-entity/my-project')     # or a list of run urls
+    table.diff().columns    # {'learning_rate': {'3kx9a2': 0.0001, 'p0q8z1': 0.0003}, ...}
+
+Runs are fetched concurrently (a bounded thread pool), with retries, and via the same
+cache as pull_wandb_config. `api` can be anything with wandb.Api's .run(path) & .runs(path).
+"""
+
+from prefigure.prefigure import fetch_wandb_config, parse_wandb_url
+from prefigure.lazy import LazyModule
+import os
+import time
+
+wandb = LazyModule('wandb')
+
+MISSING = object()   # stands in for keys that a run doesn't have
+
+
+def with_retries(fn, retries=3, backoff=1.0):
+    "calls fn(), retrying with exponential backoff if it raises. ValueErrors (e.g. offline & not cached) aren't retried"
+    for attempt in range(retries + 1):
+        try:
+            return fn()
+        except ValueError:
+            raise
+        except Exception:
+            if attempt == retries: raise
+            time.sleep(backoff * 2**attempt)
+
+
+def project_path(project):
+    "'entity/project', from that or from a project url like https://wandb.ai/entity/project"
+    splits = project.rstrip('/').split('/')
+    if '://' in project and len(splits) >= 5: return f"{splits[3]}/{splits[4]}"
+    if len(splits) == 2: return project
+    raise ValueError(f"Expected 'entity/project' or a wandb project url, got {project!r}")
+
+
+def wandb_run_urls(project, api=None, filters=None, retries=3, backoff=1.0):
+    "urls of the runs in a project (optionally only those matching wandb filters), in the form pull_wandb_config takes"
+    path = project_path(project)
+    if api is None: api = wandb.Api()
+    runs = with_retries(lambda: list(api.runs(path, filters=filters)), retries=retries, backoff=backoff)
+    return [f"https://wandb.ai/{path}/runs/{run.id}" for run in runs]
+
+
+class ConfigTable(object):
+    "configs of several runs, by key: columns = {key: {run_id: value}}. Keys a run doesn't have are left out"
+    def __init__(self, columns, runs, errors=None):
+        self.columns = columns
+        self.runs = runs                  # run ids, in the order given
+        self.errors = errors or {}        # run url: error message, for runs that couldn't be fetched
+
+    def __repr__(self):
+        return f"ConfigTable({len(self.columns)} keys x {len(self.runs)} runs, {len(self.errors)} errors)"
+
+    def row(self, key):
+        "one key's values, in run order, with MISSING where a run doesn't have it"
+        return [self.columns[key].get(run, MISSING) for run in self.runs]
+
+    def diff(self):
+        "ConfigTable of only the keys whose values aren't the same in every run"
+        differ = {}
+        for key, column in self.columns.items():
+            values = self.row(key)
+            if any(v is MISSING for v in values) or any(v != values[0] for v in values[1:]):
+                differ[key] = column
+        return ConfigTable(differ, self.runs, self.errors)
+
+    def config(self, run):
+        "one run's config, back as a dict"
+        return {key: column[run] for key, column in self.columns.items() if run in column}
+
+    def to_text(self, width=16):
+        "plain-text table, one line per key"
+        clip = lambda s: s if len(s) <= width else s[:width-1] + '~'
+        lines = [' '.join(clip(s).ljust(width) for s in ['key'] + self.runs)]
+        for key in self.columns:
+            cells = ['-' if v is MISSING else str(v) for v in self.row(key)]
+            lines.append(' '.join(clip(s).ljust(width) for s in [key] + cells))
+        return '\n'.join(lines)
+
+
+def fetch_wandb_configs(runs, api=None, cache=None, offline=None, filters=None, max_workers=8, retries=3, backoff=1.0):
+    """configs of many runs as a ConfigTable. runs is a project ('entity/project' or its url), or a list of run urls.
+       At most max_workers requests are in flight at once; each gets retries (with backoff) before being
+       counted in table.errors. api, cache & offline are as for pull_wandb_config. Offline, runs must be a list of 
+       run urls (listing a project's runs needs wandb), and configs only come from the cache"""
+    if offline is None: offline = (os.getenv('WANDB_MODE') == 'offline')
+    if offline and isinstance(runs, str):
+        raise ValueError(f"Offline mode can't list the runs of {runs!r}: pass a list of run urls instead")
+    if (api is None) and not offline: api = wandb.Api()
+    urls = wandb_run_urls(runs, api=api, filters=filters, retries=retries, backoff=backoff) if isinstance(runs, str) else list(runs)
+    urls = list(dict.fromkeys(urls))   # each run once
+
+    def fetch(url):
+        try:
+            return with_retries(lambda: fetch_wandb_config(url, api=api, cache=cache, offline=offline), retries=retries, backoff=backoff), None
+        except Exception as e:
+            return None, f"{type(e).__name__}: {e}"
+
+    if len(urls) <= 1 or max_workers <= 1:
+        results = [fetch(url) for url in urls]
+    else:
+        from concurrent.futures import ThreadPoolExecutor   # (imports logging etc, so only when needed)
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(urls))) as pool:
+            results = list(pool.map(fetch, urls))
+
+    columns, run_ids, errors = {}, [], {}
+    for url, (config, error) in zip(urls, results):
+        if error is not None:
+            errors[url] = error
+            continue
+        run_id = parse_wandb_url(url)[2]
+        run_ids.append(run_id)
+        for key, value in config.items():
+            columns.setdefault(key, {})[run_id] = value
+    return ConfigTable(columns, run_ids, errors)
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+__author__ = 'S.H. Hawley'
+
+"""
+Headless OFC control: a tiny localhost HTTP server (stdlib only) for getting and
+setting steerable args, as a lightweight alternative to the Gradio GUI.
+
+    GET  /steerables     -> {"learning_rate": 0.0001, ...}
+    GET  /args/<key>     -> {"learning_rate": 0.0001}
+    POST /args  {"learning_rate": 5e-05}  -> the new values of those keys
+    GET  /schedule       -> [[50000, "learning_rate", 1e-05], ...], the scheduled changes still to come
+    POST /schedule  [[50000, "learning_rate", 1e-05]]  -> adds to the schedule, returns all of it
+
+Values can be JSON values or strings; either way they get converted to the type of the arg (see convert.py),
+just like values typed into the GUI, and a value of the wrong type gets a 400 error.
+"""
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.request import Request, urlopen
+from prefigure.ofc import parse_schedule
+import json
+import threading
+
+
+def start_server(handle, host='127.0.0.1', port=0, debug=False):
+    """serves HTTP from a background thread. handle(method, path, body) returns (status, response), 
+       where response is a JSON-able object, or a str of HTML. returns (httpd, url)"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self): self.respond(*handle('GET', self.path, None))
+
+        def do_POST(self):
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            except ValueError as e:
+                return self.respond(400, {'error': f"bad JSON: {e}"})
+            self.respond(*handle('POST', self.path, body))
+
+        def respond(self, status, obj):
+            is_html = isinstance(obj, str)
+            data = obj.encode() if is_html else json.dumps(obj, default=str).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'text/html; charset=utf-8' if is_html else 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):   # don't spam stderr on every request
+            if debug: BaseHTTPRequestHandler.log_message(self, format, *args)
+
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=httpd.serve_forever, name='prefigure-http', daemon=True).start()
+    return httpd, f"http://{host}:{httpd.server_port}"
+
+
+class ControlServer(object):
+    "serves get/set/list-steerables for an OFC object, from a background thread"
+    def __init__(self, ofc, host='127.0.0.1', port=0):   # port=0: any free port. see .url
+        self.ofc = ofc
+        self.httpd, self.url = start_server(self.handle, host=host, port=port, debug=ofc.debug)
+
+    def steerable_values(self):
+        args_dict = vars(self.ofc.args)
+        return {key: args_dict[key] for key in self.ofc.steerables if key in args_dict}
+
+    def set_values(self, values):
+        "same path as a gui submit. returns (status, response)"
+        not_steerable = [key for key in values if key not in self.ofc.steerables]
+        if not_steerable: return 400, {'error': f"not steerable: {not_steerable}"}
+        try:
+            self.ofc.submit(values)   # (OFC's lock keeps this apart from other submits & the training loop's update())
+        except ValueError as e:   # wrong type
+            return 400, {'error': str(e)}
+        args_dict = vars(self.ofc.args)
+        return 200, {key: args_dict.get(key) for key in values}
+
+    def add_schedule(self, entries):
+        "returns (status, response)"
+        if not isinstance(entries, list): return 400, {'error': 'expected a JSON list of [step, key, value]'}
+        try:
+            entries = parse_schedule(entries)
+            not_steerable = [key for _, key, _ in entries if key not in self.ofc.steerables]
+            if not_steerable: return 400, {'error': f"not steerable: {not_steerable}"}
+            self.ofc.add_schedule(entries)
+        except (ValueError, TypeError) as e:
+            return 400, {'error': str(e)}
+        return 200, self.ofc.scheduled()
+
+    def handle(self, method, path, body):
+        "routes a request. returns (http status, JSON-able response)"
+        parts = [p for p in path.split('?')[0].split('/') if p]
+        if method == 'GET' and parts == ['steerables']:
+            return 200, self.steerable_values()
+        if method == 'GET' and len(parts) == 2 and parts[0] == 'args':
+            values = self.steerable_values()
+            if parts[1] not in values: return 404, {'error': f"no steerable arg {parts[1]}"}
+            return 200, {parts[1]: values[parts[1]]}
+        if method == 'POST' and parts == ['args']:
+            if not isinstance(body, dict): return 400, {'error': 'expected a JSON object of key: value'}
+            return self.set_values(body)
+        if method == 'GET' and parts == ['schedule']:
+            return 200, self.ofc.scheduled()
+        if method == 'POST' and parts == ['schedule']:
+            return self.add_schedule(body)
+        return 404, {'error': f"unknown request {method} {path}"}
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class ControlClient(object):
+    "talks to a ControlServer, e.g. ControlClient(ofc.control_url).set(learning_rate=5e-5)"
+    def __init__(self, url, timeout=10):
+        self.url, self.timeout = url.rstrip('/'), timeout
+
+    def request(self, path, body=None):
+        data = None if body is None else json.dumps(body, default=str).encode()
+        req = Request(self.url + path, data=data, headers={'Content-Type': 'application/json'})
+        with urlopen(req, timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+    def steerables(self):
+        return self.request('/steerables')
+
+    def get(self, key):
+        return self.request(f'/args/{key}')[key]
+
+    def set(self, values=None, **kwargs):
+        return self.request('/args', dict(values or {}, **kwargs))
+
+    def schedule(self, entries=None):
+        "adds [(step, key, value), ...] to the schedule, if given. returns the schedule still to come"
+        if entries is None: return self.request('/schedule')
+        return self.request('/schedule', [list(e) for e in entries])
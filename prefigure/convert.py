@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+__author__ = 'S.H. Hawley'
+
+"""
+Typed converters for OFC values. Each arg gets a converter made once, from the type of
+its original value, which turns a new value (usually a string from the OFC file or GUI)
+into that same type, or raises ValueError rather than quietly changing the arg's type.
+"""
+
+from prefigure.prefigure import arg_eval
+from ast import literal_eval
+from pathlib import Path
+import json
+
+
+def to_bool(value):
+    if isinstance(value, bool): return value
+    if isinstance(value, int) and value in [0, 1]: return bool(value)
+    if isinstance(value, str) and value.strip().lower() in ['true', '1', 'yes']: return True
+    if isinstance(value, str) and value.strip().lower() in ['false', '0', 'no']: return False
+    raise ValueError(f"can't convert {value!r} to bool")
+
+
+def to_int(value):
+    if isinstance(value, bool): raise ValueError(f"can't convert {value!r} to int")
+    if isinstance(value, int): return value
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            value = float(value)   # e.g. '1e4'. (raises ValueError if it's not a number at all)
+    if isinstance(value, float) and value.is_integer(): return int(value)
+    raise ValueError(f"can't convert {value!r} to int")
+
+
+def to_float(value):
+    if isinstance(value, bool): raise ValueError(f"can't convert {value!r} to float")
+    if isinstance(value, (int, float, str)): return float(value)
+    raise ValueError(f"can't convert {value!r} to float")
+
+
+def to_str(value):
+    if not isinstance(value, str): return str(value)
+    val = arg_eval(value)    # strip quotes, i.e. "'myrun'" -> 'myrun'
+    return val if isinstance(val, str) else value
+
+
+def to_path(value):
+    if isinstance(value, (str, Path)): return Path(value)
+    raise ValueError(f"can't convert {value!r} to Path")
+
+
+def parse_literal(value):
+    "python or JSON literal from a string"
+    try:
+        return literal_eval(value.strip())
+    except (SyntaxError, ValueError):
+        pass
+    try:
+        return json.loads(value)
+    except ValueError:
+        raise ValueError(f"can't parse {value!r}")
+
+
+SCALAR_CONVERTERS = [(bool, to_bool), (int, to_int), (float, to_float), (str, to_str), (Path, to_path)]  # bool before int!
+
+def scalar_converter(template):
+    for template_type, converter in SCALAR_CONVERTERS:
+        if isinstance(template, template_type): return converter
+    return None
+
+
+def make_container_converter(container_type, item_converter):
+    "for lists, tuples & dicts"
+    def convert(value):
+        if isinstance(value, str): value = parse_literal(value)
+        if container_type is dict:
+            if not isinstance(value, dict): raise ValueError(f"can't convert {value!r} to dict")
+            return value
+        if not isinstance(value, (list, tuple)): raise ValueError(f"can't convert {value!r} to {container_type.__name__}")
+        if item_converter is not None: value = [item_converter(v) for v in value]
+        return container_type(value)
+    return convert
+
+
+def make_converter(template):
+    "returns a function that converts new values to the type of template (e.g. an arg's original value)"
+    converter = scalar_converter(template)
+    if converter is not None: return converter
+    if isinstance(template, (list, tuple)):
+        item_types = {type(v) for v in template}   # lists of all-one-type get their items converted too
+        item_converter = scalar_converter(template[0]) if len(item_types) == 1 else None
+        return make_container_converter(type(template), item_converter)
+    if isinstance(template, dict): return make_container_converter(dict, None)
+    return arg_eval   # None, or something exotic: anything goes, as before
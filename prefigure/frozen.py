@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+__author__ = 'S.H. Hawley'
+
+"""
+Frozen args: a read-only, slotted stand-in for the argparse.Namespace from get_all_args,
+for sending to DataLoader workers & DDP processes.
+
+    args = get_all_args(frozen=True)     # or freeze_args(args)
+    args.learning_rate, vars(args)       # same as before
+    args2 = args.replace(learning_rate=5e-5)   # new args; everything else (e.g. imported configs) is shared, not copied
+    args.save('run-args.pkl')            # after this, pickling args just sends the path,
+                                         # and each process loads (mmaps) the file once
+"""
+
+from prefigure.journal import write_atomic
+import hashlib
+import mmap
+import os
+import pickle
+
+
+class FrozenDict(dict):
+    "read-only dict, for imported sub-configs. (still a dict, so json, isinstance & co. work as before)"
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("FrozenDict is read-only")
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = __ior__ = _read_only
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+
+class FrozenList(list):
+    "read-only list. (still a list, so [4, 2] == args.ratios & co. work as before)"
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("FrozenList is read-only")
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    append = extend = insert = pop = remove = clear = sort = reverse = _read_only
+
+    def __reduce__(self):
+        return (FrozenList, (list(self),))
+
+
+def freeze(value, memo):
+    """dicts & lists, at any depth, become FrozenDicts & FrozenLists. 
+       memo makes a dict or list that appears twice become one frozen one"""
+    if isinstance(value, (FrozenDict, FrozenList)): return value    # already frozen: share it
+    if isinstance(value, (dict, list)):
+        if id(value) not in memo:
+            if isinstance(value, dict):
+                frozen = FrozenDict((k, freeze(v, memo)) for k, v in value.items())
+            else:
+                frozen = FrozenList(freeze(v, memo) for v in value)
+            memo[id(value)] = (value, frozen)
+        return memo[id(value)][1]
+    if isinstance(value, tuple): return tuple(freeze(v, memo) for v in value)
+    return value
+
+
+loaded = {}   # (absolute path, mtime, size, inode): FrozenArgs, so each process reads a saved file only once
+
+def file_signature(path):
+    "cheap check for whether a saved file is still the one that was saved"
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def load_frozen_args(path, digest=None):
+    """loads FrozenArgs saved with .save(path). the file is memory-mapped rather than read into a bytes copy first.
+       with digest (what pickling saved args sends), raises ValueError if the file isn't the one that was saved"""
+    path = os.path.abspath(path)
+    cache_key = (path,) + file_signature(path)
+    if cache_key not in loaded:
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            args = FrozenArgs(pickle.loads(mm))
+            saved = (cache_key[1:], hashlib.sha1(mm).hexdigest())
+        object.__setattr__(args, '_path', path)
+        object.__setattr__(args, '_saved', saved)
+        loaded[cache_key] = args
+    args = loaded[cache_key]
+    if (digest is not None) and (digest != args._saved[1]):
+        raise ValueError(f"FrozenArgs: {path} has been overwritten since these args were saved there")
+    return args
+
+
+class FrozenArgs(object):
+    "read-only args. attribute access & vars(args) work like argparse.Namespace; use .replace() to change things"
+    __slots__ = ('_values', '_path', '_saved', '__weakref__')   # _saved = (file_signature, sha1 of contents) of _path
+
+    def __init__(self, values=None, **kwargs):
+        values = dict(values or {}, **kwargs)
+        memo = {}
+        object.__setattr__(self, '_values', FrozenDict((key, freeze(val, memo)) for key, val in values.items()))
+        object.__setattr__(self, '_path', None)   # set by save(): where these exact values are on disk
+        object.__setattr__(self, '_saved', None)
+
+    def __getattr__(self, key):    # (only called for names that aren't slots or methods)
+        try:
+            return self._values[key]
+        except KeyError:
+            raise AttributeError(f"'FrozenArgs' object has no attribute '{key}'") from None
+
+    def __setattr__(self, key, value):
+        raise AttributeError(f"FrozenArgs is read-only, use args = args.replace({key}=...)")
+
+    def __delattr__(self, key):
+        raise AttributeError("FrozenArgs is read-only")
+
+    @property
+    def __dict__(self):
+        "so that vars(args) works. (read-only, but still a dict, e.g. for json.dumps(vars(args)))"
+        return self._values
+
+    def __contains__(self, key):
+        return key in self._values
+
+    def __eq__(self, other):
+        if isinstance(other, FrozenArgs): return self._values == other._values
+        if hasattr(other, '__dict__'): return self._values == vars(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return 'FrozenArgs(' + ', '.join(f"{key}={val!r}" for key, val in self._values.items()) + ')'
+
+    def replace(self, **changes):
+        "new FrozenArgs with changes. unchanged values are shared with this one, not copied"
+        new = FrozenArgs.__new__(FrozenArgs)
+        memo = {}
+        object.__setattr__(new, '_values', FrozenDict(self._values, **{key: freeze(val, memo) for key, val in changes.items()}))
+        object.__setattr__(new, '_path', None)
+        object.__setattr__(new, '_saved', None)
+        return new
+
+    def save(self, path):
+        "writes these args to path; from then on pickling them (e.g. to spawned workers) only sends the path"
+        data = pickle.dumps(dict(self._values), protocol=pickle.HIGHEST_PROTOCOL)
+        write_atomic(path, data)
+        object.__setattr__(self, '_path', os.path.abspath(path))
+        object.__setattr__(self, '_saved', (file_signature(path), hashlib.sha1(data).hexdigest()))
+        return self
+
+    def __reduce__(self):
+        "just the path (& a hash, checked by the receiver) if the saved file is unchanged; otherwise the values"
+        if self._path is not None:
+            try:
+                if file_signature(self._path) == self._saved[0]:
+                    return (load_frozen_args, (self._path, self._saved[1]))
+            except OSError:   # gone
+                pass
+        return (FrozenArgs, (dict(self._values),))
+
+    def to_namespace(self):
+        "a regular (mutable) argparse.Namespace, with plain dicts"
+        import argparse
+        return argparse.Namespace(**{key: thaw(val) for key, val in self._values.items()})
+
+
+def thaw(value):
+    if isinstance(value, dict): return {k: thaw(v) for k, v in value.items()}
+    if isinstance(value, list): return [thaw(v) for v in value]
+    if isinstance(value, tuple): return tuple(thaw(v) for v in value)
+    return value
+
+
+def freeze_args(args):
+    "FrozenArgs from an argparse.Namespace (e.g. from get_all_args) or a dict"
+    if isinstance(args, FrozenArgs): return args
+    return FrozenArgs(args if isinstance(args, dict) else vars(args))
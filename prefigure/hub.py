@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+__author__ = 'S.H. Hawley'
+
+"""
+One OFC hub for all the runs on a machine, instead of a Gradio server per run.
+
+Each run makes its OFC with registry_dir=..., which just registers the run there (one small JSON
+file) and uses a journal; it hosts no server and its update() stays a cheap check. Then one
+`OFCHub(registry_dir)` (e.g. `python -m prefigure.hub ~/.cache/prefigure/runs`) finds the
+active runs and routes edits to the right run's journal:
+
+    GET  /                          -> a plain HTML page listing the runs & their values
+    GET  /runs                      -> {"run1": {"pid": 1234, "steerables": [...], ...}, ...}
+    GET  /runs/<name>/steerables    -> {"learning_rate": 0.0001, ...}
+    GET  /runs/<name>/args/<key>    -> {"learning_rate": 0.0001}
+    POST /runs/<name>/args  {"learning_rate": 5e-05}  -> the new values of those keys
+"""
+
+from prefigure.control import start_server
+from prefigure.convert import make_converter
+from prefigure.journal import Journal
+from html import escape
+import json
+import os
+import threading
+
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:   # it's there, just someone else's
+        return True
+    return True
+
+
+class OFCHub(object):
+    "discovers runs in registry_dir and serves one control surface for all of them"
+    def __init__(self, registry_dir, host='127.0.0.1', port=0, compact_every=1000, debug=False):
+        self.registry_dir, self.compact_every = registry_dir, compact_every
+        self.journals = {}     # name: [(journal path, run's start time), Journal reader, dict of values read from it, # appended]
+        self.converters = {}   # (name, key): converter, made from the value the run registered
+        self.lock = threading.Lock()
+        os.makedirs(registry_dir, exist_ok=True)
+        self.httpd, self.url = start_server(self.handle, host=host, port=port, debug=debug)
+        print(f"OFC hub is {self.url}, for runs registered in {registry_dir}")
+
+    def runs(self):
+        "registry entries of the runs that are still alive. {name: entry}"
+        runs = {}
+        for filename in sorted(os.listdir(self.registry_dir)):
+            if not filename.endswith('.json'): continue
+            try:
+                with open(os.path.join(self.registry_dir, filename)) as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):   # just removed, say
+                continue
+            if pid_alive(entry['pid']): runs[filename[:-len('.json')]] = entry   # (the file name is the name, made URL-safe)
+        for name in set(self.journals) - set(runs): del self.journals[name]   # forget finished runs
+        return runs
+
+    def journal(self, name, entry):
+        "this hub's reader for a run's journal (a new one if the run restarted, even under the same name & journal path)"
+        run = (entry['journal'], entry.get('started'))
+        if self.journals.get(name, [None])[0] != run:
+            self.journals[name] = [run, Journal(entry['journal']), {}, 0]
+            self.converters = {k: c for k, c in self.converters.items() if k[0] != name}
+        return self.journals[name]
+
+    def values(self, name, entry):
+        "the run's steerable values: as it last registered them, plus any newer journal changes"
+        path, journal, journaled, appended = self.journal(name, entry)
+        journaled.update((r['key'], r['value']) for r in journal.read_new())
+        values = dict(entry['values'])
+        values.update((key, val) for key, val in journaled.items() if key in values)
+        return values
+
+    def convert(self, name, entry, key, val):
+        if (name, key) not in self.converters:
+            self.converters[(name, key)] = make_converter(entry['values'][key])
+        return self.converters[(name, key)](val)
+
+    def set_values(self, name, entry, values):
+        "appends changes to the run's journal; the run picks them up on its next update(). returns (status, response)"
+        not_steerable = [key for key in values if key not in entry['steerables']]
+        if not_steerable: return 400, {'error': f"not steerable: {not_steerable}"}
+        try:
+            values = {key: self.convert(name, entry, key, val) for key, val in values.items()}
+        except ValueError as e:   # wrong type
+            return 400, {'error': str(e)}
+        old = self.values(name, entry)
+        changes = {key: val for key, val in values.items() if val != old.get(key)}
+        record = self.journals[name]
+        if changes:
+            record[1].append(changes)
+            record[3] += len(changes)
+        new = self.values(name, entry)
+        if record[3] >= self.compact_every:   # fold the journal into a snapshot, as the run itself would
+            record[1].compact(dict(record[2]))
+            record[3] = 0
+        return 200, {key: new.get(key) for key in values}
+
+    def page(self, runs):
+        "minimal HTML overview"
+        rows = []
+        for name, entry in runs.items():
+            values = self.values(name, entry)
+            cells = ''.join(f"<tr><td>{escape(key)}</td><td>{escape(str(val))}</td></tr>" for key, val in values.items())
+            rows.append(f"<h2>{escape(name)} <small>(pid {entry['pid']})</small></h2><table>{cells}</table>")
+        return (f"<html><head><title>OFC hub</title></head><body><h1>OFC hub: {len(runs)} run(s)</h1>"
+                + ''.join(rows) + "<p>Set values with POST /runs/&lt;name&gt;/args</p></body></html>")
+
+    def handle(self, method, path, body):
+        "routes a request. returns (http status, JSON-able response or HTML)"
+        parts = [p for p in path.split('?')[0].split('/') if p]
+        with self.lock:
+            runs = self.runs()
+            if method == 'GET' and parts == []:
+                return 200, self.page(runs)
+            if method == 'GET' and parts == ['runs']:
+                return 200, {name: {key: entry[key] for key in ['pid', 'time', 'ofc_file', 'steerables']}
+                             for name, entry in runs.items()}
+            if len(parts) < 3 or parts[0] != 'runs':
+                return 404, {'error': f"unknown request {method} {path}"}
+            name = parts[1]
+            if name not in runs: return 404, {'error': f"no active run {name}"}
+            entry = runs[name]
+            if method == 'GET' and parts[2:] == ['steerables']:
+                return 200, self.values(name, entry)
+            if method == 'GET' and len(parts) == 4 and parts[2] == 'args':
+                values = self.values(name, entry)
+                if parts[3] not in values: return 404, {'error': f"no steerable arg {parts[3]}"}
+                return 200, {parts[3]: values[parts[3]]}
+            if method == 'POST' and parts[2:] == ['args']:
+                if not isinstance(body, dict): return 400, {'error': 'expected a JSON object of key: value'}
+                return self.set_values(name, entry, body)
+            return 404, {'error': f"unknown request {method} {path}"}
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+    p = argparse.ArgumentParser(description='Serve one OFC control surface for all runs registered in a directory')
+    p.add_argument('registry_dir', help='the registry_dir the runs were given')
+    p.add_argument('--host', default='127.0.0.1')
+    p.add_argument('--port', type=int, default=7860)
+    opts = p.parse_args()
+    hub = OFCHub(opts.registry_dir, host=opts.host, port=opts.port)
+    try:
+        while True: time.sleep(3600)
+    except KeyboardInterrupt:
+        hub.close()
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+__author__ = 'S.H. Hawley'
+
+"""
+Opt-in timing instrumentation: how long each stage of get_all_args takes, and OFC's
+poll & parse costs and change latency (from GUI submit until update() applies it).
+
+Off by default, when it costs one attribute check per timed section.
+Turn on with PREFIGURE_METRICS=1 or metrics.enable(). Then each measurement
+  - is passed to any hooks added with metrics.add_hook(fn), as fn(name, seconds),
+  - is logged as a JSON line to the 'prefigure' logger (at INFO level),
+  - is accumulated for metrics.dump(), a plain-text (Prometheus-style) summary.
+"""
+
+from prefigure.lazy import LazyModule
+import contextlib
+import json
+import os
+import re
+import time
+
+logging = LazyModule('logging')   # only needed once enabled
+
+NULL_TIMER = contextlib.nullcontext()
+
+
+class Timer(object):
+    "context manager that records the time spent inside it"
+    __slots__ = ('metrics', 'name', 'start')
+    def __init__(self, metrics, name):
+        self.metrics, self.name = metrics, name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.record(self.name, time.perf_counter() - self.start)
+
+
+class Metrics(object):
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.hooks = []
+        self.stats = {}    # name: [count, total seconds, last seconds, max seconds]
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def add_hook(self, fn):
+        "fn(name, seconds) gets called for every measurement"
+        self.hooks.append(fn)
+
+    def timer(self, name):
+        "with metrics.timer('read_defaults'): ..."
+        return Timer(self, name) if self.enabled else NULL_TIMER
+
+    def start(self):
+        "for code where a with-block is awkward: t = metrics.start(); ...; metrics.stop('name', t)"
+        return time.perf_counter() if self.enabled else None
+
+    def stop(self, name, start):
+        if start is not None: self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        if not self.enabled: return
+        stat = self.stats.setdefault(name, [0, 0.0, 0.0, 0.0])
+        stat[0] += 1
+        stat[1] += seconds
+        stat[2] = seconds
+        stat[3] = max(stat[3], seconds)
+        logging.getLogger('prefigure').info(json.dumps({'metric': name, 'seconds': seconds, 'time': time.time()}))
+        for hook in self.hooks:
+            hook(name, seconds)
+
+    def dump(self):
+        "plain-text summary of everything recorded so far, one 'name value' per line"
+        lines = []
+        for name, (count, total, last, biggest) in sorted(self.stats.items()):
+            name = 'prefigure_' + re.sub(r'\W', '_', name)
+            lines += [f"{name}_count {count}", f"{name}_seconds_total {total:.9f}",
+                      f"{name}_seconds_last {last:.9f}", f"{name}_seconds_max {biggest:.9f}"]
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        self.stats = {}
+
+
+metrics = Metrics(enabled=os.getenv('PREFIGURE_METRICS', '') not in ['', '0'])
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+__author__ = 'S.H. Hawley'
+
+"""
+Append-only journal of OFC changes: each change is one JSON line
+    {"seq": 12, "time": 1700000000.0, "step": null, "key": "learning_rate", "value": 0.0001}
+so writing a change costs O(1) and a reader only reads what's been added since it last looked.
+Every so often, compact() folds everything into a snapshot file and starts a fresh journal.
+"""
+
+import os
+import json
+import time
+import tempfile
+from contextlib import contextmanager
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+def write_atomic(path, text):
+    "write to a temp file & rename, so readers never see half a file. (text can be bytes too)"
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    with os.fdopen(fd, 'wb' if isinstance(text, bytes) else 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+class Journal(object):
+    "one instance can be a writer, a reader, or both. Several writers are ok (they take turns via a file lock)"
+    def __init__(self, path, snapshot_path=None):
+        self.path = path
+        self.snapshot_path = snapshot_path or path + '.snapshot'
+        self.lock_path = path + '.lock'
+        self.offset, self.inode, self.last_seq = 0, None, 0   # how far this reader has got
+
+    @contextmanager
+    def locked(self):
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, 'w') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def read_snapshot(self):
+        try:
+            with open(self.snapshot_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'seq': 0, 'time': 0, 'values': {}}
+
+    def file_seq(self):
+        "the last seq number written, by anybody. (call while locked)"
+        seq = self.read_snapshot()['seq']
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(0, os.SEEK_END)
+                f.seek(max(0, f.tell() - 65536))
+                lines = f.read().splitlines()
+        except OSError:
+            return seq
+        for line in reversed(lines):
+            try:
+                return max(seq, json.loads(line)['seq'])
+            except (ValueError, KeyError):   # partial line at the start of the chunk
+                continue
+        return seq
+
+    def append(self, changes, step=None):
+        "writes one record per key in changes (a dict). returns the records"
+        with self.locked():
+            seq, now = self.file_seq(), time.time()
+            records = []
+            for key, value in changes.items():
+                seq += 1
+                records.append({'seq': seq, 'time': now, 'step': step, 'key': key, 'value': value})
+            data = ''.join(json.dumps(r, default=str) + '\n' for r in records).encode()
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, data)   # one O_APPEND write, so readers never see records interleaved
+            finally:
+                os.close(fd)
+        return records
+
+    def read_new(self):
+        "records added since the last call. O(1) (one os.stat) if there aren't any"
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return []
+        records = []
+        if (st.st_ino != self.inode) or (st.st_size < self.offset):   # first look, or the journal got compacted: start with the snapshot
+            snapshot = self.read_snapshot()
+            if snapshot['seq'] > self.last_seq:
+                records = [{'seq': snapshot['seq'], 'time': snapshot['time'], 'step': None, 'key': key, 'value': value}
+                           for key, value in snapshot['values'].items()]
+                self.last_seq = snapshot['seq']
+            self.inode, self.offset = st.st_ino, 0
+        if st.st_size <= self.offset: return records
+
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read()
+        end = data.rfind(b'\n') + 1   # leave any partial last line for next time
+        self.offset += end
+        for line in data[:end].splitlines():
+            record = json.loads(line)
+            if record['seq'] > self.last_seq:
+                records.append(record)
+                self.last_seq = record['seq']
+        return records
+
+    def unread(self):
+        "records newer than what this reader has read (another writer's snapshot included), without moving it on. (call while locked)"
+        records = []
+        try:
+            with open(self.path, 'rb') as f:
+                same_file = (os.fstat(f.fileno()).st_ino == self.inode)
+                f.seek(self.offset if same_file else 0)
+                data = f.read()
+        except OSError:
+            same_file, data = False, b''
+        if not same_file:   # somebody compacted since this reader last looked
+            snapshot = self.read_snapshot()
+            if snapshot['seq'] > self.last_seq:
+                records = [{'seq': snapshot['seq'], 'key': key, 'value': value} for key, value in snapshot['values'].items()]
+        for line in data.splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record['seq'] > self.last_seq: records.append(record)
+        return records
+
+    def compact(self, values):
+        """writes values (i.e. everything this reader has read) as the snapshot and starts an empty journal.
+           records this reader hasn't read yet (e.g. from another writer) get folded in, not lost: the reader 
+           then gets them from the snapshot on its next read_new()"""
+        with self.locked():
+            values = dict(values)
+            values.update((r['key'], r['value']) for r in self.unread())
+            self.write_snapshot(values)
+
+    def reset(self):
+        "starts over with nothing in the snapshot or journal, e.g. for a new run reusing an old run's journal path"
+        with self.locked():
+            self.write_snapshot({})
+
+    def write_snapshot(self, values):
+        "(call while locked)"
+        seq = self.file_seq()   # (seq numbers carry on, so readers still at an old journal's records see the change)
+        write_atomic(self.snapshot_path, json.dumps({'seq': seq, 'time': time.time(), 'values': values}, default=str))
+        write_atomic(self.path, '')   # new inode, so readers know to look at the snapshot
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+__author__ = 'S.H. Hawley'
+
+"""
+Lazy imports for heavy optional modules (wandb, gradio).
+
+`import prefigure` gets done by every DDP rank and DataLoader worker, most of
+which only ever call get_all_args. So wandb & gradio are only imported the
+first time something actually touches them.
+"""
+
+import importlib
+import sys
+
+HEAVY_MODULES = ['wandb', 'gradio']   # things `import prefigure` should never pull in by itself
+
+
+class LazyModule(object):
+    "stand-in for a module that doesn't get imported until one of its attributes is accessed"
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        if self._module is None:
+            self.__dict__['_module'] = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<LazyModule '{self._name}' ({state})>"
+
+
+def eagerly_imported(modules=HEAVY_MODULES):
+    "returns which of the given heavy modules have already been imported, e.g. for import-time regression checks"
+    return [m for m in modules if m in sys.modules]
@@ -7,17 +7,106 @@ On-the-Fly (User) Control (& Calibration)
 This allows for changes to 
 """
 
-from prefigure import get_all_args, arg_eval
+from prefigure import get_all_args
+from prefigure.prefigure import load_config, import_sources, imported_files
+from prefigure.convert import make_converter, parse_literal
+from prefigure.lazy import LazyModule
+from prefigure.journal import Journal, write_atomic
+from prefigure.instrument import metrics
+from prefigure.frozen import FrozenArgs, FrozenDict, freeze
 import configparser
-import gradio as gr
-import gradio.blocks as gb
+import hashlib
+import heapq
 import itertools
-from copy import deepcopy
 import os
+import re
+import json
 import warnings 
-import wandb
+import threading
+import time
 from datetime import datetime, timedelta
-from collections import OrderedDict
+from collections import OrderedDict, deque
+
+gr = LazyModule('gradio')     # gradio only gets imported once a GUI is actually made
+wandb = LazyModule('wandb')
+
+
+class FileWatcher(object):
+    "cheap check for whether a file has changed: compares os.stat's (mtime, size, inode) instead of re-reading the file"
+    def __init__(self, path):
+        self.path, self.signature = path, None
+
+    def stat(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def changed(self):
+        "True if the file is different from how it was at the last call (or if this is the first call)"
+        signature = self.stat()
+        if signature == self.signature: return False
+        self.signature = signature
+        return True
+
+
+def file_hash(path):
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def apply_diff(old, new, prefix=''):
+    """makes dict old the same as dict new, only touching keys whose values differ (recursing into sub-dicts).
+       returns (result, {dotted key: new value}). plain dicts get changed in place; FrozenDicts get 
+       copied instead, sharing whatever didn't change. keys that were removed are reported as None"""
+    result, changed = {}, {}
+    for key, val in new.items():
+        old_val = old.get(key)
+        if isinstance(old_val, dict) and isinstance(val, dict):
+            val, sub_changed = apply_diff(old_val, val, f"{prefix}{key}.")
+            changed.update(sub_changed)
+        elif (key not in old) or (old_val != val):
+            changed[prefix + key] = val
+        else:
+            val = old_val
+        result[key] = val
+    changed.update((prefix + key, None) for key in old if key not in new)
+    if not changed: return old, {}
+    if isinstance(old, FrozenDict): return freeze(result, {}), changed
+    for key in [k for k in old if k not in new]: del old[key]
+    old.update(result)
+    return old, changed
+
+
+def replace_nested(d, keys, value):
+    "d, with d[keys[0]][keys[1]]... = value. FrozenDicts get copied rather than changed"
+    if not keys: return value
+    child = replace_nested(d[keys[0]], keys[1:], value)
+    if child is d[keys[0]]: return d
+    if isinstance(d, FrozenDict): return freeze(dict(d, **{keys[0]: child}), {})
+    d[keys[0]] = child
+    return d
+
+
+def parse_schedule(entries):
+    """list of (step, key, value) from entries: such a list, or a string of one (a python/JSON literal),
+       or of lines like '50000, learning_rate, 1e-5'"""
+    if isinstance(entries, str):
+        try:
+            entries = parse_literal(entries)
+        except ValueError:
+            entries = [line.split(',', 2) for line in entries.splitlines() if line.strip()]
+    schedule = []
+    for entry in entries:
+        if len(entry) != 3: raise ValueError(f"OFC schedule entries should be (step, key, value), got {entry!r}")
+        step, key, value = entry
+        schedule.append((int(step), str(key).strip(), value.strip() if isinstance(value, str) else value))
+    return schedule
+
 
 class OFC(object):
     "On-the-Fly Control: Saves args to a new file, updates 'args' when changes occur to file"
@@ -28,30 +117,92 @@ class OFC(object):
                  sliders=False,     # if True, use sliders instead of text boxes for float/int values, with min/max guessed at from args
                  steerables=None,   # list of names of args allowed to steer. None or [] means Nothing is steerable
                  use_wandb=True,    # make use of wandb for logging changes etc
+                 watch=False,       # if True, update() only re-parses ofc_file when os.stat says the file has changed
+                 watch_interval=None, # seconds. if given, a background thread watches ofc_file and update() just collects what it found
+                 role=None,         # None: standalone. 'owner': owns file & gui, shares changes with 'follower's on this machine. 'auto': owner iff LOCAL_RANK==0
+                 channel_name=None, # name of shared-memory segment for owner/followers, default is 'ofc-'+args.name
+                 channel_size=65536, # bytes. the owner shares all changes so far, pickled, so make this bigger if you steer big lists/dicts
+                 publisher=None,    # optional WandbPublisher: changes & the gui url then get sent to wandb in the background
+                 journal=False,     # if True, changes get appended to <name>-ofc.journal instead of rewriting the whole INI file
+                 compact_every=1000, # with journal, fold the journal into a snapshot after this many changes
+                 control_port=None, # if given, serve a lightweight headless HTTP control endpoint on localhost instead of the gui. 0 = any free port
+                 registry_dir=None, # if given, register this run there, to be steered by an OFCHub. implies journal=True, and no gui or server here
+                 schedule=None,     # list of (step, key, value): set key to value once update(step=...) reaches step. also read from args.ofc_schedule
+                 watch_imports=False, # if True, re-read config files that parse_imports put into args (e.g. a model .json) when their contents change
                  debug=False,
                  ):
         "NOTE: ofc_file should be given a unique name if multiple similar runs are occuring"
         self.ofc_file = args.name+'-'+ofc_file
         self.args = args   
-        self.use_gui = use_gui or (hasattr(args,"use_gui") and args.use_gui)
+        if role == 'auto': role = 'owner' if int(os.getenv('LOCAL_RANK', 0)) == 0 else 'follower'
+        self.role = role
+        self.use_gui = (role != 'follower') and (registry_dir is None) and (use_gui or (hasattr(args,"use_gui") and args.use_gui))
         self.sliders = sliders
         self.steerables = steerables if steerables else [] # Not all args need be steerable
-        self.use_wandb, self.debug = use_wandb, debug
+        self.use_wandb, self.publisher, self.debug = use_wandb, publisher, debug
 
         self.section_name = 'OFC'
         self.gradio_url, self.demo, self.demo_datetime = '', None, None
-        self.columns = None
+        self.control, self.control_url = None, ''
+        self.journal = None
+        self.registry_file = None
+        self.columns, self.page_size = None, None
         self.args_gui_dict = OrderedDict()     # where we will keep the gui values
+        self.converters = {}                   # key: function converting new values to the type of the original value
+        self.raw = {}                          # key: string last read from ofc_file, to skip converting what hasn't changed
+        self.submitted_at = None               # time of the earliest submit not yet applied by update(), for latency metrics
+        self.step = None                       # the last step given to update(), recorded with journal entries
 
-        self.save(args)
-        if self.use_gui: self.create_gradio_interface(sliders=sliders)
+        self.watch = watch or (watch_interval is not None)
+        self.watcher = FileWatcher(self.ofc_file)
+        self.callbacks = {}                    # key: list of functions to call when that key changes
+        self.pending = deque()                 # changes found by the watcher thread, waiting for update()
+        self.watch_thread, self.stop_event = None, threading.Event()
+        self.lock = threading.RLock()          # update() & submit() get called from the training loop, gui & control server threads
+
+        self.channel, self.published = None, {}   # published = all changes so far, as shared with followers
+        if role in ['owner', 'follower']:
+            from prefigure.channel import SharedChannel   # imports here & below keep `import prefigure` fast
+            self.channel = SharedChannel(channel_name or 'ofc-'+args.name, create=(role == 'owner'), size=channel_size)
+        self.schedule, self.schedule_lock = [], threading.Lock()   # heap of (step, order added, key, value)
+        self.schedule_order = itertools.count()
+        for entries in [getattr(args, 'ofc_schedule', None), schedule]:   # (followers apply the same schedule at the same steps)
+            if entries: self.add_schedule(entries)
+        watch_imports = watch_imports and (role != 'follower')   # followers get the owner's import changes via the channel
+        self.import_sources = dict(import_sources.get(id(args), {})) if watch_imports else {}   # top-level key: path
+        self.import_files, self.imports = {}, {}   # dotted key: path, and path: [FileWatcher, hash of contents]
+        self.pending_imports = deque()   # lists of (dotted key, new contents) re-read by the watcher thread, for update()
+        self.followed = {}               # follower: dotted keys as last read from the channel
+        self.track_imports()
+        if role == 'follower': return   # followers never touch the file or make a gui
+
+        self.journal, self.journaled, self.compact_every = None, {}, compact_every   # journaled = all changes read so far
+        self.appended = 0                      # changes appended since the last compaction
+        if registry_dir is not None:
+            journal, control_port = True, None
+            self.registry_file = os.path.join(registry_dir, re.sub(r'[^\w.-]', '_', args.name) + '.json')
+            self.started = time.time()   # tells the hub this is a new run, even if the name & journal path are the same
+        if journal:
+            self.journal = Journal(os.path.splitext(self.ofc_file)[0] + '.journal')
+            self.journal.reset()     # start fresh, ignoring anything left over from a previous run
+            self.journal.read_new()
+        self.save(args)   # with journal, the INI file is just an export, for reading (it doesn't get re-read)
+        if self.journal is None: self.raw = self.read_raw()   # so update() only converts what gets edited from now on
+        if control_port is not None:
+            from prefigure.control import ControlServer
+            self.control = ControlServer(self, port=control_port)
+            self.control_url = self.control.url   # can access via ofc.control_url hook
+            print(f"OFC control endpoint is {self.control_url}")
+        elif self.use_gui: self.create_gradio_interface(sliders=sliders)
+        if self.registry_file is not None: self.register()
+        if watch_interval is not None: self.start_watching(interval=watch_interval)
 
 
     def save(self, args):
-        "saves all steerable params (args) as new INI file"
+        "saves all steerable params (args, or a dict of them) as new INI file"
         config = configparser.ConfigParser()
         config.add_section(self.section_name)
-        for key, val in vars(args).items():
+        for key, val in (args if isinstance(args, dict) else vars(args)).items():
             if self.debug: print("OFC.save: Saving ",key," = ",val," to ",self.ofc_file)
             config[self.section_name][key] = str(val)
         if self.debug: print("OFC.save: Saving to ",self.ofc_file)
@@ -59,70 +210,402 @@ class OFC(object):
             config.write(f)
 
 
-    def update(self):
-        "generic update loop; find out which variables have changed; see if gui needs relaunching"
-        save_args_dict = vars(self.args)
+    def read(self):
+        "parses ofc_file (or new journal records), returns dict of (evaluated) values"
+        with self.lock, metrics.timer('ofc_parse'):
+            return self.read_values()
+
+
+    def read_values(self):
+        if self.journal is not None:
+            records = self.journal.read_new()
+            if records and (self.submitted_at is None) and self.diff({r['key']: r['value'] for r in records}):
+                self.submitted_at = records[0]['time']   # (whoever wrote them. no-op records wouldn't get applied)
+            self.journaled.update((r['key'], r['value']) for r in records)   # (including other writers' changes)
+            return self.convert_values({r['key']: r['value'] for r in records})
+        new_raw = {key: val for key, val in self.read_raw().items() if self.raw.get(key) != val}
+        self.raw.update(new_raw)
+        return self.convert_values(new_raw)
+
+
+    def read_raw(self):
+        "the strings in ofc_file, by key"
         config = configparser.ConfigParser()
         config.read(self.ofc_file)
-        new_args_dict = dict(config.items(self.section_name))
+        return dict(config.items(self.section_name))
 
-        changed = {}
-        for key, val in new_args_dict.items():
-            if not (',' in val):  # changes to list variables are not supported yet
-                val = arg_eval(val)
-                if (val != save_args_dict[key]) and (key != 'wandb_config'):
-                    print(f"\n  OFC: {key} has been changed to {val}")
-                    changed[key] = val
-                    vars(self.args)[key] = val    # NOTE: THIS will overwrite values in args.
-
-        # relaunch gui before temp url expires
-        if self.use_gui and self.demo and (not '127.0.0.1' in self.gradio_url) and (self.demo_datetime is not None)  and (self.demo_datetime - datetime.now() >= timedelta(hours=71)): 
-            print("OFC: Not long now til Gradio public temp URL would expire. Relaunching GUI.")
-            self.create_gradio_interface(columns=self.columns, sliders=self.sliders)
+
+    def convert(self, key, val):
+        "converts a new value for key to the type of the arg's original value, or raises ValueError"
+        if key not in self.converters: self.converters[key] = make_converter(vars(self.args).get(key))
+        return self.converters[key](val)
+
+
+    def convert_values(self, values):
+        "converts a dict of new values, warning about & skipping any that are the wrong type"
+        converted = {}
+        for key, val in values.items():
+            try:
+                converted[key] = self.convert(key, val)
+            except ValueError as e:
+                warnings.warn(f"OFC: ignoring new value for {key}: {e}")
+        return converted
+
+
+    def diff(self, new_args_dict, old_args_dict=None):
+        "which values in new_args_dict differ from those in old_args_dict (default: args)"
+        if old_args_dict is None: old_args_dict = vars(self.args)
+        return {key: val for key, val in new_args_dict.items() 
+                if (key != 'wandb_config') and (val != old_args_dict.get(key))}
+
+
+    def update(self, step=None):
+        """generic update loop; find out which variables have changed; see if gui needs relaunching.
+           with step, also applies any scheduled changes that are due"""
+        with self.lock:   # (reentrant: submit() holds it too)
+            start = metrics.start()
+            if step is not None: self.step = step
+            if self.watch_thread is not None:
+                reloaded = self.reload_imports(self.collect_imports())
+            else:
+                reloaded = self.reload_imports() if self.imports else {}   # (already applied to args)
+            if reloaded: self.fire_callbacks(reloaded)
+            scheduled = self.diff(self.due(step))
+            if scheduled: self.fire_callbacks(scheduled)
+            if self.role == 'follower':                 # no file I/O, just check the owner's shared memory
+                published = self.channel.read()
+                changed, followed = self.follow(published) if published else ({}, {})
+                self.fire_callbacks(dict(changed, **followed))
+                reloaded = dict(reloaded, **followed)
+            elif self.watch_thread is not None:           # background thread has done the work already
+                changed = self.collect_pending()
+            elif self.watch and (self.journal is None) and not self.watcher.changed():  # (journal reads are cheap already)
+                changed = {}
+            else:
+                changed = self.diff(self.read())
+                self.fire_callbacks(changed)
+            if scheduled and (self.journal is not None):   # so the journal (and the hub reading it) stays the truth
+                scheduled = {key: val for key, val in scheduled.items() if key not in changed}
+                if scheduled:
+                    self.journal.append(scheduled, step=self.step)
+                    self.journaled.update(scheduled)
+                    self.appended += len(scheduled)
+            if scheduled: changed = dict(scheduled, **changed)   # (an edit arriving at the same time wins)
+
+            for key, val in changed.items():
+                print(f"\n  OFC: {key} has been changed to {val}")
+            if changed: self.set_args(changed)
+            if changed and self.publisher is not None: self.publisher.update_config(changed)
+            if (changed or reloaded) and self.role == 'owner':
+                for key in [k for k in self.published if k.split('.')[0] in changed and '.' in k]:
+                    del self.published[key]   # a new value for a whole arg replaces any nested changes to it
+                self.published.update(changed)
+                self.published.update(reloaded)   # dotted keys, e.g. 'model.depth'
+                try:
+                    self.channel.publish(self.published)
+                except ValueError as e:   # too big for the segment: followers miss out, but training goes on
+                    warnings.warn(f"OFC: couldn't share changes with followers: {e}. Use a bigger channel_size")
+            if changed and self.registry_file is not None: self.register()   # so the hub shows current values
+            if changed and self.submitted_at is not None:
+                if metrics.enabled: metrics.record('ofc_latency', time.time() - self.submitted_at)
+                self.submitted_at = None
+            if reloaded:
+                for key, val in reloaded.items(): print(f"\n  OFC: {key} has been changed to {val} (imported file changed)")
+                if self.publisher is not None: self.publisher.update_config(reloaded)
+                changed = dict(changed, **reloaded)
+            metrics.stop('ofc_poll', start)
+
+            # relaunch gui before temp url expires
+            if self.use_gui and self.demo and (not '127.0.0.1' in self.gradio_url) and (self.demo_datetime is not None)  and (self.demo_datetime - datetime.now() >= timedelta(hours=71)): 
+                print("OFC: Not long now til Gradio public temp URL would expire. Relaunching GUI.")
+                self.create_gradio_interface(columns=self.columns, sliders=self.sliders, page_size=self.page_size)
             
-        return changed   # changed dict can be used for wandb logging of changes
+            return changed   # changed dict can be used for wandb logging of changes
+
+
+    def track_imports(self):
+        "(re)builds the list of imported files to watch, including nested imports. new files get their contents hashed"
+        self.import_files = {key: path for key, path in imported_files(sources=self.import_sources).items() if not path.endswith('.gin')}
+        paths = set(self.import_files.values())
+        for path in paths - set(self.imports):
+            watcher = FileWatcher(path)
+            watcher.changed()
+            self.imports[path] = [watcher, file_hash(path)]
+        for path in set(self.imports) - paths: del self.imports[path]   # no longer imported by anything
+
+
+    def reload_imports(self, loaded=None):
+        """applies the new contents of imported files (default: check_imports()) to args, changing just the differences.
+           returns {dotted key: new value}, e.g. {'model.depth': 12}"""
+        if loaded is None: loaded = self.check_imports()
+        changed = {}
+        for key, new in loaded:
+            changed.update(self.apply_import(key, new))
+        return changed
+
+
+    def check_imports(self):
+        """re-reads the imported files whose contents changed. costs one os.stat per file if nothing changed.
+           returns [(dotted key, new contents)], parents first. doesn't touch args, so the watcher thread can call it"""
+        changed_paths = []
+        for path, state in self.imports.items():
+            if not state[0].changed(): continue
+            digest = file_hash(path)
+            if digest == state[1]: continue   # touched, but the same contents
+            state[1] = digest
+            changed_paths.append(path)
+        if not changed_paths: return []
+
+        loaded, reloaded = [], []
+        for key in sorted(self.import_files, key=lambda k: k.count('.')):   # parents first. reloading those reloads their imports too
+            path = self.import_files[key]
+            if (path not in changed_paths) or any(key.startswith(r + '.') for r in reloaded): continue
+            reloaded.append(key)
+            try:
+                new = load_config(path)
+            except Exception as e:   # half-written, or a typo: keep the old values, try again when the file changes next
+                warnings.warn(f"OFC: couldn't reload {path} (imported as {key}): {e}")
+                self.imports[path][1] = None   # (keeping the stat signature, so an unchanged broken file costs one os.stat)
+                continue
+            loaded.append((key, new))
+        self.track_imports()   # the changed files may import different files now
+        return loaded
+
+
+    def collect_imports(self):
+        "grabs whatever imported files the watcher thread has re-read"
+        loaded = []
+        while self.pending_imports:
+            loaded += self.pending_imports.popleft()
+        return loaded
+
+
+    def follow(self, published):
+        """follower: splits what the owner published into (changes to args, nested changes from imported files).
+           the nested ones get applied to args right away, as reload_imports does for the owner"""
+        args_dict = vars(self.args)
+        changed = self.diff({key: val for key, val in published.items() if key in args_dict})
+        followed = {}
+        for key, val in published.items():
+            if (key in args_dict) or ((key in self.followed) and (self.followed[key] == val)): continue
+            self.followed[key] = val
+            followed.update(self.apply_import(key, val))
+        return changed, followed
+
+
+    def apply_import(self, key, new):
+        "applies the new contents of an imported file to args, at (dotted) key. returns what changed"
+        keys, value = key.split('.'), vars(self.args)
+        try:
+            for k in keys: value = value[k]
+        except (KeyError, TypeError):   # args don't look like they did at import any more
+            return {}
+        if isinstance(value, dict) and isinstance(new, dict):
+            new_value, changed = apply_diff(value, new, key + '.')
+        else:
+            new_value, changed = new, ({key: new} if new != value else {})
+        if changed and (new_value is not value):   # FrozenArgs, or not a dict
+            self.set_args({keys[0]: replace_nested(vars(self.args)[keys[0]], keys[1:], new_value)})
+        return changed
+
 
+    def add_schedule(self, entries):
+        """adds (step, key, value) entries (see parse_schedule) to the schedule. 
+           raises ValueError (before adding any) for unknown keys or values that can't be converted"""
+        entries = parse_schedule(entries)
+        unknown = [key for _, key, _ in entries if key not in vars(self.args)]
+        if unknown: raise ValueError(f"OFC schedule: no such args {unknown}")
+        entries = [(step, key, self.convert(key, value)) for step, key, value in entries]
+        with self.schedule_lock:
+            for step, key, value in entries:
+                heapq.heappush(self.schedule, (step, next(self.schedule_order), key, value))
 
-    def create_gui_element(self,key,value, sliders=False):
+
+    def scheduled(self):
+        "the schedule still to come, as a sorted list of (step, key, value)"
+        with self.schedule_lock:
+            return [(step, key, value) for step, _, key, value in sorted(self.schedule)]
+
+
+    def due(self, step):
+        "pops the scheduled changes whose step has been reached. O(1) when there aren't any"
+        if (step is None) or (not self.schedule) or (self.schedule[0][0] > step): return {}
+        due = {}
+        with self.schedule_lock:
+            while self.schedule and self.schedule[0][0] <= step:
+                _, _, key, value = heapq.heappop(self.schedule)
+                due[key] = value    # (later entries for the same key win)
+        return due
+
+
+    def set_args(self, changed):
+        "NOTE: THIS will overwrite values in args. FrozenArgs can't be changed in place, so those get replaced by new ones: use ofc.args"
+        if isinstance(self.args, FrozenArgs):
+            self.args = self.args.replace(**changed)
+        else:
+            vars(self.args).update(changed)
+
+
+    def on_change(self, key, fn):
+        "registers fn(key, value) to be called when key changes. With watch_interval, fn runs in the watcher thread"
+        self.callbacks.setdefault(key, []).append(fn)
+
+
+    def fire_callbacks(self, changed):
+        for key, val in changed.items():
+            for fn in self.callbacks.get(key, []):
+                try:
+                    fn(key, val)
+                except Exception as e:
+                    warnings.warn(f"OFC: callback {fn} for {key} failed: {e}")
+
+
+    def collect_pending(self):
+        "grabs whatever the watcher thread has queued up. deque pops are atomic, so no lock needed"
+        changed = {}
+        while self.pending:
+            changed.update(self.pending.popleft())
+        return self.diff(changed)   # skip anything that's already been applied to args
+
+
+    def start_watching(self, interval=1.0):
+        "starts a background thread that checks ofc_file every interval seconds, queues changes for update()"
+        if self.watch_thread is not None: return
+        self.watch = True
+        self.stop_event.clear()
+        self.watch_thread = threading.Thread(target=self.watch_loop, args=(interval,), name='ofc-watcher', daemon=True)
+        self.watch_thread.start()
+
+
+    def stop_watching(self):
+        if self.watch_thread is None: return
+        self.stop_event.set()
+        self.watch_thread.join()
+        self.watch_thread = None
+
+
+    def watch_loop(self, interval):
+        "runs in the watcher thread"
+        last_read = None   # compare to what the thread saw last, so nothing gets queued twice
+        while not self.stop_event.wait(interval):
+            if self.imports:
+                loaded = self.check_imports()   # (re-reading & parsing happens here; update() just applies the changes)
+                if loaded: self.pending_imports.append(loaded)
+            if (self.journal is None) and not self.watcher.changed(): continue
+            new_args_dict = self.read()
+            if not new_args_dict: continue
+            if last_read is None: last_read = dict(vars(self.args))
+            changed = self.diff(new_args_dict, last_read)
+            last_read.update(new_args_dict)
+            if changed:
+                if self.debug: print(f"OFC.watch_loop: found changes {changed}")
+                self.pending.append(changed)
+                self.fire_callbacks(changed)
+
+
+    def close(self):
+        "stops the watcher thread & control server, and releases the shared-memory channel, if any"
+        self.stop_watching()
+        if self.control is not None: self.control.close()
+        if self.registry_file is not None and os.path.exists(self.registry_file): os.remove(self.registry_file)
+        if self.journal is not None: self.export()
+        if self.channel is not None: self.channel.close()
+
+
+    def register(self):
+        "writes (or refreshes) this run's entry in the registry directory, for OFCHub"
+        args_dict = vars(self.args)
+        entry = {'name': self.args.name, 'pid': os.getpid(), 'started': self.started, 'time': time.time(),
+                 'journal': os.path.abspath(self.journal.path), 'ofc_file': os.path.abspath(self.ofc_file),
+                 'steerables': self.steerable_keys(), 
+                 'values': {key: args_dict[key] for key in self.steerable_keys()}}
+        os.makedirs(os.path.dirname(os.path.abspath(self.registry_file)), exist_ok=True)
+        write_atomic(self.registry_file, json.dumps(entry, default=str))
+
+
+    def create_gui_element(self,key,value, sliders=False, visible=True, text_only=False):
         "creates a single gui element based on variable type, by defalt no sliders, just text fields and buttons"
-        if isinstance(value, bool):
-            input_element = gr.components.Radio([True, False], value=value, label=key)
+        if text_only:
+            input_element = gr.components.Textbox(value=self.gui_value(value, text_only=True), label=key, visible=visible)
+        elif isinstance(value, bool):
+            input_element = gr.components.Radio([True, False], value=value, label=key, visible=visible)
         elif isinstance(value, int) and sliders:
             maximum = value * 2 if value > 0 else 1
-            input_element = gr.components.Slider(minimum=0, maximum=maximum, value=value, label=key, step=1)
+            input_element = gr.components.Slider(minimum=0, maximum=maximum, value=value, label=key, step=1, visible=visible)
         elif isinstance(value, float) and sliders:
             maximum = value * 2 if value > 0.0 else 1.0
-            input_element = gr.components.Slider(minimum=0.0, maximum=maximum, value=value, label=key)
+            input_element = gr.components.Slider(minimum=0.0, maximum=maximum, value=value, label=key, visible=visible)
         elif isinstance(value, str):
-            input_element = gr.components.Textbox(value=value, label=key)
+            input_element = gr.components.Textbox(value=value, label=key, visible=visible)
         else:
-            input_element = gr.components.Textbox(value=str(value), label=key) # for lists, etc.
+            input_element = gr.components.Textbox(value=str(value), label=key, visible=visible) # for lists, etc.
         return input_element
 
 
+    def steerable_keys(self, query=''):
+        "the steerable args that are actually in args (not 'gui'), optionally only those containing query"
+        args_dict, query = vars(self.args), query.strip().lower()
+        return [key for key in self.steerables if (key in args_dict) and (key != 'gui') and (query in key.lower())]
+
+
+    def page_keys(self, query='', page=0, page_size=48):
+        "one page's worth of steerable_keys(query). page numbers wrap around"
+        keys = self.steerable_keys(query)
+        num_pages = max(1, -(-len(keys) // page_size))
+        page = int(page or 0) % num_pages
+        return keys[page*page_size:(page+1)*page_size]
+
+
+    def gui_value(self, value, sliders=False, text_only=False):
+        "what a gui element made by create_gui_element shows for value"
+        if isinstance(value, str) or ((not text_only) and (isinstance(value, bool) or (sliders and isinstance(value, (int, float))))): 
+            return value
+        return str(value)
+
+
     def create_gradio_interface(self, 
                                 sliders=False,  # turns on sliders for floats & ints; default is all text fields
-                                columns=3, ):
-        "for all variables in args, create gui elements"
-        self.columns, self.sliders = columns, sliders     # update storage viewed elsewhere
+                                columns=3, 
+                                page_size=48,   # with more steerables than this, show a search box & pages of text fields
+                                ):
+        "for all steerable variables in args, create gui elements"
+        self.columns, self.sliders, self.page_size = columns, sliders, page_size     # update storage viewed elsewhere
 
-        inputs = []
         args_dict =  vars(self.args)
-        column_length = len(args_dict)//columns
+        keys = self.steerable_keys()
+        paged = len(keys) > page_size
+        if paged: keys = keys[:page_size]   # each page re-uses the same text fields
+        self.args_gui_dict = OrderedDict((key, self.gui_value(args_dict[key], sliders, text_only=paged)) for key in keys)
+        column_length = -(-len(keys) // columns)   # rounded up, so nothing gets left out
         with gr.Blocks(title="OFC", theme=gr.themes.Base()) as demo:
             gr.Markdown(f'<center><h1>prefigure: On-the-Fly Control (OFC)</h1></center>')        
+            if paged:
+                with gr.Row():
+                    search = gr.Textbox(label="search", placeholder="only show args containing...")
+                    page = gr.Number(value=0, label="page", precision=0)
+                page_state = gr.State(keys)   # which keys are on the page being shown
+            inputs = []
             with gr.Row():
                 for c in range(columns):
                     with gr.Column():
-                        for key, value in itertools.islice(args_dict.items(), c*column_length, (c+1)*column_length):
-                            if key=='gui': continue  # don't add 'gui' var to gui
-                            if key not in self.steerables: continue
+                        for i in range(c*column_length, min((c+1)*column_length, page_size if paged else len(keys))):
+                            key = keys[i] if i < len(keys) else f'({i})'   # pages have empty slots at the end
+                            value = args_dict.get(key, '')
                             if self.debug: print("key = ",key," value = ",value,", type = ",type(value))
-                            self.args_gui_dict[key] = value
-                            input_element = self.create_gui_element(key,value, sliders=sliders)
-                            inputs.append(input_element)
+                            inputs.append(self.create_gui_element(key, value, sliders=sliders, visible=(i < len(keys)), text_only=paged))
             submit_button = gr.Button(value="Submit", variant='primary',)
-            submit_button.click(fn=self.on_gui_submit, inputs=inputs)
+            with gr.Accordion("Schedule", open=False):
+                with gr.Row():
+                    schedule_input = gr.Textbox(label="add to schedule", lines=3, placeholder="step, key, value  (one per line)")
+                    schedule_view = gr.Textbox(label="still to come", lines=3, value=self.schedule_text(), interactive=False)
+                schedule_button = gr.Button(value="Add")
+            schedule_button.click(fn=self.on_gui_schedule, inputs=[schedule_input], outputs=[schedule_view])
+            if paged:
+                search.change(fn=self.on_gui_page, inputs=[search, page], outputs=[page_state]+inputs)
+                page.change(fn=self.on_gui_page, inputs=[search, page], outputs=[page_state]+inputs)
+                submit_button.click(fn=self.on_gui_page_submit, inputs=[page_state]+inputs)
+            else:
+                submit_button.click(fn=self.on_gui_submit, inputs=inputs)
         print()
 
         auth = ( os.getenv('OFC_USERNAME', ''), os.getenv('OFC_PASSWORD', '') )
@@ -136,7 +619,9 @@ class OFC(object):
 
         print(f"Demo launched. Gradio URL is {gradio_url} Moving on.")
         if self.use_wandb and wandb.run is not None:
-            wandb.log({"gradio_url": wandb.Html(f'OFC Gradio URL = <a href="{gradio_url}" target="_blank">{gradio_url}</a>')})
+            url_html = {"gradio_url": wandb.Html(f'OFC Gradio URL = <a href="{gradio_url}" target="_blank">{gradio_url}</a>')}
+            if self.publisher is not None: self.publisher.log(url_html)
+            else: wandb.log(url_html)
             demo.integrate(wandb=wandb)
         self.gradio_url = gradio_url   # can access via ofc.gradio_url hook 
         self.demo_datetime = datetime.now()  # save time of deployment
@@ -145,23 +630,79 @@ class OFC(object):
     def on_gui_submit(self, 
                       *gui_values, # tuple of gui values but no keys :-/ 
                       ):
-        "writes to the ofc file, then updates the args. detection of param type (float, int, etc.) performed by file reader"
+        "submits only the gui values that have changed. conversion to the param's type (float, int, etc.) is done by submit"
         if self.debug: print(f"gui_values = {gui_values}, type = {type(gui_values)}")
+        self.submit_gui_values(list(self.args_gui_dict.keys()), gui_values)
+
+
+    def submit_gui_values(self, keys, gui_values):
+        "diffs gui values against what the gui was showing, submits just the changes"
+        changed = {key: val for key, val in zip(keys, gui_values) if val != self.args_gui_dict.get(key)}
+        if self.debug: print(f"OFC.submit_gui_values: changed = {changed}")
+        if not changed: return
+        self.submit(changed)                 # (raises ValueError for a bad value, which the gui shows)
+        self.args_gui_dict.update(changed)
+
+
+    def on_gui_page(self, query, page):
+        "gui callback for search & page changes: refills the text fields with one page of steerables"
+        keys, args_dict = self.page_keys(query, page, self.page_size), vars(self.args)
+        for key in keys: self.args_gui_dict[key] = str(args_dict[key])   # what the page will be showing
+        updates = [gr.update(label=key, value=self.args_gui_dict[key], visible=True) for key in keys]
+        updates += [gr.update(visible=False)] * (self.page_size - len(keys))
+        return [keys] + updates
+
+
+    def on_gui_page_submit(self, keys, *gui_values):
+        "gui callback for submitting a page"
+        self.submit_gui_values(keys, gui_values)
+
+
+    def schedule_text(self):
+        return '\n'.join(f"{step}, {key}, {value}" for step, key, value in self.scheduled())
+
+
+    def on_gui_schedule(self, text):
+        "gui callback for adding to the schedule. only steerable args can be scheduled from the gui"
+        entries = parse_schedule(text)
+        not_steerable = [key for _, key, _ in entries if key not in self.steerables]
+        if not_steerable: raise ValueError(f"OFC schedule: not steerable: {not_steerable}")
+        self.add_schedule(entries)
+        return self.schedule_text()
+
+
+    def submit(self, values):
+        """writes new values (a dict, e.g. from the gui) to the ofc file or journal, then updates the args.
+           raises ValueError (before writing anything) if any value can't be converted to its arg's type.
+           with journal, this costs O(changes); without, it rewrites the whole ofc file"""
+        with self.lock:
+            values = {key: self.convert(key, val) for key, val in values.items()}
+            changes = self.diff(values)   # only write what's actually different
+            if not changes: return        # (and don't start a latency measurement that no update() would end)
+            if self.submitted_at is None: self.submitted_at = time.time()
+            if self.journal is not None:
+                self.journal.append(changes, step=self.step)
+                self.appended += len(changes)
+                self.update()
+                if self.appended >= self.compact_every: self.compact()
+                return
+
+            # save args, with the new values, to file and update to fill args
+            self.save({key: changes.get(key, val) for key, val in vars(self.args).items()})
+            self.update() 
+
+
+    def compact(self):
+        "folds the journal into a snapshot, and exports the current args to the INI file"
+        self.journal.compact(dict(self.journaled))
+        self.appended = 0
+        self.export()
+
 
-        # update args_gui_dict with new values from gui submit
-        for key, new_val in zip(self.args_gui_dict.keys(), gui_values):
-            self.args_gui_dict[key] = new_val
-       
-        # update a copy of args with args_gui_dict values
-        args_copy = deepcopy(self.args)
-        for key in vars(args_copy).keys():
-            for key2 in self.args_gui_dict.keys():
-                if key == key2:
-                    vars(args_copy)[key] = self.args_gui_dict[key2]
-                
-        # save args_copy to file and update to fill args
-        self.save(args_copy) 
-        self.update() 
+    def export(self):
+        """writes the current args to the INI file, for people to look at. With journal, this happens at 
+           compaction & close (not on every change, which would cost a whole-file write each time), or whenever you call it"""
+        self.save(self.args)
 
 
 if __name__ == '__main__':
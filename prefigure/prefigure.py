@@ -11,13 +11,20 @@ from pathlib import Path
 from ast import literal_eval 
 import argparse
 import configparser
-import wandb
 import sys
-import copy
-import distutils
 import json
+import os
+import re
+import hashlib
+import weakref
+from prefigure.lazy import LazyModule
+from prefigure.cache import DiskCache
+from prefigure.instrument import metrics
+
+wandb = LazyModule('wandb')  # only imported when pull/push_wandb_config get called
 
 DEFAULTS_FILE = 'defaults.ini'  # override via --config-file
+WANDB_CACHE_TTL = 24*60*60      # seconds for which a pulled wandb config is re-used without asking wandb again
 
 def arg_eval(value):
     "this just packages some type checking for parsing args"
@@ -84,32 +91,181 @@ def read_defaults(defaults_file=DEFAULTS_FILE):
     return defaults, defaults_text
 
 
+IMPORT_SUFFIXES = ['.ini','.json','.gin']
+import_cache = {}   # absolute path: (signatures, parsed config), see cached_config. Private: everybody gets copies
+import_tree = {}    # absolute path: {key: absolute path} of the files that file imports itself
+import_sources = {} # id(args): {key: absolute path} of the files parse_imports put into args, e.g. for OFC to watch
+
+def import_keys(imports):
+    "the 'imports' arg can be a comma-separated string or a list"
+    if isinstance(imports, str): return [k.strip() for k in imports.split(',') if k.strip()]
+    return list(imports or [])
+
+
+def import_path(key, value, base_dir=None):
+    "if value is the name of a config file to import, returns its path (relative to base_dir, if it's there), else None"
+    if (key in ['wandb_config','config_file']): return None  # don't read in the basics a second time
+    if isinstance(value, str): value = arg_eval(value)        # values from imported .ini files are still raw strings
+    if not (isinstance(value, str) and Path(value).suffix in IMPORT_SUFFIXES): return None
+    if base_dir is not None and not os.path.isabs(value) and os.path.exists(os.path.join(base_dir, value)):
+        return os.path.join(base_dir, value)
+    return value
+
+
+def copy_config(config):
+    "copy of a (nested) config's dicts & lists, so it can be edited without affecting anyone else. the values themselves are shared"
+    if isinstance(config, dict): return {key: copy_config(val) for key, val in config.items()}
+    if isinstance(config, list): return [copy_config(val) for val in config]
+    return config
+
+
+def file_signature(path):
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def cached_config(config_file, stack=(), debug=False):
+    """(signatures, config): config is read_config's, with nested imports, and signatures are the (mtime, size) 
+       of the file & of everything it imports, by path. Re-used while none of those files change. 
+       The config is the cache's own copy: don't hand it out, see load_config"""
+    path = os.path.abspath(config_file)
+    if path in stack: raise ValueError("Circular config import: " + ' -> '.join(stack + (path,)))
+    if '.gin' == Path(path).suffix:   # gin parsing has side effects, so don't cache
+        return {path: file_signature(path)}, read_config(config_file)[0]
+    entry = import_cache.get(path)
+    if entry is not None:
+        try:
+            if all(file_signature(p) == signature for p, signature in entry[0].items()): return entry
+        except OSError:   # an import has gone missing: re-read, to get the proper error
+            pass
+    if debug: print(f"load_config: Parsing config file {path}")
+    signatures = {path: file_signature(path)}
+    config, _ = read_config(path)
+    import_tree[path] = {}
+    load_imports(config, import_keys(config.get('imports')), base_dir=os.path.dirname(path), stack=stack+(path,), 
+                 debug=debug, sources=import_tree[path], signatures=signatures)
+    import_cache[path] = (signatures, config)
+    return import_cache[path]
+
+
+def load_config(config_file, stack=(), debug=False):
+    """read_config, but with nested imports: if the config has its own 'imports', those get loaded too.
+       Files are only parsed again when they (or what they import) change; each call gets its own copy. 
+       stack is for detecting import cycles."""
+    return copy_config(cached_config(config_file, stack=stack, debug=debug)[1])
+
+
+def load_imports(config, keys, base_dir=None, stack=(), debug=False, sources=None, signatures=None):
+    """replaces config[key] with (a copy of) the contents of the config file it names, for each of keys. Different files get read concurrently.
+       if given, the dict sources gets key: absolute path of each file imported, and signatures gets those of cached_config"""
+    paths = {}
+    for key in keys:
+        path = import_path(key, config.get(key), base_dir=base_dir)
+        if path is not None: paths[key] = path
+    if not paths: return config
+
+    files = list(dict.fromkeys(paths.values()))   # each file only once, even if imported under several keys
+    threaded = [f for f in files if '.gin' != Path(f).suffix]   # gin has global state, so its files go one at a time
+    loaded = {f: cached_config(f, stack=stack, debug=debug) for f in files if f not in threaded}
+    if len(threaded) == 1:
+        loaded[threaded[0]] = cached_config(threaded[0], stack=stack, debug=debug)
+    elif threaded:
+        from concurrent.futures import ThreadPoolExecutor   # (imports logging etc, so only when needed)
+        with ThreadPoolExecutor(max_workers=min(8, len(threaded))) as pool:
+            for f, entry in zip(threaded, pool.map(lambda f: cached_config(f, stack=stack, debug=debug), threaded)):
+                loaded[f] = entry
+    for key, path in paths.items():
+        if debug: print(f"load_imports: Replacing the following: {key}:{loaded[path][1]}",)
+        config[key] = copy_config(loaded[path][1])    # (every key gets its own copy, to edit as it likes)
+        if sources is not None: sources[key] = os.path.abspath(path)
+        if signatures is not None: signatures.update(loaded[path][0])
+    return config
+
+
 def parse_imports(args, debug=False):
     "If the user has supplied args which are themselves config files, parse them"
     if not hasattr(args, 'imports'): return args
-    orig_args = copy.deepcopy(args)  # not good to edit args while looping over args
-    for key, value in vars(orig_args).items():
-        if debug: print(f"parse_imports: key = {key}, value = {value}")
-        if (key in ['wandb_config','config_file']): continue  # don'e read in the basics a second time
-        if key in args.imports and isinstance(value, str) and Path(value).suffix in ['.ini','.json','.gin']:
-            # if the arg is a string and the string is a path to a config file
-            # then parse it and add the args to the namespace
-            if debug: print(f"parse_imports: Parsing config file {value}")
-            new_value, value_text = read_config(value)
-            # for any of those, delete the namespace attribute before adding it below
-            #delattr(args, key)
-
-            if debug: print(f"parse_imports: Replacing the following in the namespace: {key}:{new_value}",)
-            #args = argparse.Namespace(**vars(args), **defaults)
-            setattr(args, key, new_value)
+    sources = {}
+    load_imports(vars(args), import_keys(args.imports), debug=debug, sources=sources)  # edits args in place, no need for a copy
+    set_import_sources(args, sources)
     return args
 
 
+def set_import_sources(args, sources):
+    "remembers which files args' imports came from (Namespaces aren't hashable, hence id & a finalizer to clean up)"
+    if id(args) not in import_sources: weakref.finalize(args, import_sources.pop, id(args), None)
+    import_sources[id(args)] = sources
 
 
-def setup_args(defaults, defaults_text='',):
-    """combine defaults from .ini file and add parseargs arguments, 
-        with help pull from .ini"""
+def imported_files(args=None, sources=None):
+    """{dotted key: absolute path} of every file imported into args, including nested imports,
+       e.g. {'model': '/configs/model.json', 'model.encoder': '/configs/encoder.json'}"""
+    if sources is None: sources = import_sources.get(id(args), {})
+    files = {}
+    for key, path in sources.items():
+        files[key] = path
+        for sub_key, sub_path in imported_files(sources=import_tree.get(path, {})).items():
+            files[f"{key}.{sub_key}"] = sub_path
+    return files
+
+
+
+
+INI_KEY_RE = re.compile(r'^([^\s\[#;=:][^=:]*?)\s*[=:]')   # "key = value" or "key: value", not indented, not a [section]
+
+def read_help(defaults_text):
+    "one pass over the lines of a config file: returns dict of key: the comment on the line just above it"
+    helps, comment = {}, ''
+    for line in defaults_text:
+        stripped = line.strip()
+        if stripped.startswith(('#', ';')):
+            comment = stripped.lstrip('#;').strip()
+            continue
+        match = INI_KEY_RE.match(line)
+        if match: helps[match.group(1)] = comment
+        comment = ''
+    return helps
+
+
+SCHEMA_TYPES = {t.__name__: t for t in [str, int, float, complex, bool, list, tuple, dict, set, bytes, type(None)]}
+SCHEMA_TYPES['Path'] = Path
+schema_cache = DiskCache('schema', max_entries=100)   # keyed by hash of config contents
+parser_cache = {}                                     # same keys, for repeat calls within one process
+
+def compile_schema(defaults, defaults_text=''):
+    "list of [key, type name, default (as string), help] for each allowed arg"
+    helps = read_help(defaults_text)
+    schema = []
+    for key, value in defaults.items():
+        if (key in ['wandb_config','config_file']): break
+        val = Path(value) if ((type(value) == str) and ('_dir' in value)) else arg_eval(value)
+        type_name = 'Path' if isinstance(val, Path) else type(val).__name__
+        if type_name not in SCHEMA_TYPES:   # shouldn't happen, but then it's a string as far as argparse is concerned
+            val, type_name = str(val), 'str'
+        default = str(val) if type_name in ['Path', 'str', 'float'] else repr(val)
+        schema.append([key, type_name, default, helps.get(key, '')])
+    return schema
+
+
+def schema_default(type_name, default):
+    "inverse of how compile_schema stores defaults"
+    if type_name in ['str', 'float', 'Path']: return SCHEMA_TYPES[type_name](default)
+    return literal_eval(default)
+
+
+def config_hash(defaults, defaults_text=''):
+    return hashlib.sha1((repr(list(defaults.items())) + ''.join(defaults_text)).encode()).hexdigest()
+
+
+def build_parser(defaults, defaults_text=''):
+    "argparse parser for these defaults, via a schema that is cached on disk (and in memory) by content hash"
+    key = config_hash(defaults, defaults_text)
+    if key in parser_cache: return parser_cache[key]
+    schema = schema_cache.get(key)
+    if schema is None:
+        schema = compile_schema(defaults, defaults_text)
+        schema_cache.put(key, schema)
+
     p = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)  
     # --help and the next few args are always there regardless of what user supplies
     p.add_argument('--config-file', required=False, default=DEFAULTS_FILE, #added so it appears on -h list
@@ -119,16 +275,10 @@ def setup_args(defaults, defaults_text='',):
 
 
     # add other CLI args using defaults .ini file, i.e. it determines what args are 'allowed'
-    for key, value in defaults.items():
-        if (key in ['wandb_config','config_file']): break
-        help = ""
-        for i in range(len(defaults_text)):  # get the help string from defaults_text
-            if key in defaults_text[i]:
-                help = defaults_text[i-1].replace('# ','')
+    for key, type_name, default, help in schema:
         argname = '--'+key.replace('_','-')
         #if '--name' == argname: continue
-        val = Path(value) if ((type(value) == str) and ('_dir' in value)) else arg_eval(value)
-        val_type = type(val)
+        val, val_type = schema_default(type_name, default), SCHEMA_TYPES[type_name]
         #print(f"argname: {argname}, val: {val}, val_type: {val_type}")
         if val is None: # None is weird in Python
             p.add_argument(argname, type=str, nargs='?', const=None, default=None, help=help)
@@ -137,56 +287,106 @@ def setup_args(defaults, defaults_text='',):
         else: # normal string/int/etc
             #val_type = bool(distutils.util.strtobool(val))
             p.add_argument(argname, type=val_type, nargs='?', const=True, default=False, help=help)
+    parser_cache[key] = p
+    return p
 
-    args = p.parse_args() 
-        
+
+def setup_args(defaults, defaults_text='',):
+    """combine defaults from .ini file and add parseargs arguments, 
+        with help pull from .ini"""
+    args = build_parser(defaults, defaults_text).parse_args() 
     return args
     
 
-def pull_wandb_config(wandb_config, defaults):
-    """overwrites parts of defaults using wandb config info 
-       wandb_config is the url of one of your runs"""
-    api = wandb.Api()  # might get prompted for api key login the first time
+def parse_wandb_url(wandb_config):
+    "gets entity, project & run_id from the url of a wandb run"
     splits = wandb_config.split('/')
-    entity, project, run_id = splits[3], splits[4], splits[-1].split('?')[0]
-    run = api.run(f"{entity}/{project}/{run_id}")
-    for key, value in run.config.items():
+    return splits[3], splits[4], splits[-1].split('?')[0]
+
+
+def fetch_wandb_config(wandb_config, api=None, cache=None, offline=None):
+    """returns the config dict of a wandb run, via a local cache (see DiskCache) when possible.
+       Only one process per machine does the actual fetch; the others wait for it & read the cache. 
+       cache=False turns off caching. offline=True (or WANDB_MODE=offline) only uses the cache."""
+    entity, project, run_id = parse_wandb_url(wandb_config)
+    run_path = f"{entity}/{project}/{run_id}"
+    if offline is None: offline = (os.getenv('WANDB_MODE') == 'offline')
+    if cache is False: 
+        if offline: raise ValueError(f"Offline mode needs the cache to get the config for {run_path}")
+        if api is None: api = wandb.Api()
+        return dict(api.run(run_path).config)
+    if cache is None: cache = DiskCache('wandb', ttl=WANDB_CACHE_TTL)
+
+    if offline:
+        config = cache.get(run_path, ignore_ttl=True)
+        if config is None:
+            raise ValueError(f"Offline mode, and no cached config for {run_path} in {cache.dir}")
+        return config
+    config = cache.get(run_path)
+    if config is None:
+        with cache.lock(run_path):
+            config = cache.get(run_path)     # somebody else may have fetched it while we waited
+            if config is None:
+                if api is None: api = wandb.Api()  # might get prompted for api key login the first time
+                config = dict(api.run(run_path).config)
+                cache.put(run_path, config)
+    return config
+
+
+def pull_wandb_config(wandb_config, defaults, api=None, cache=None, offline=None):
+    """overwrites parts of defaults using wandb config info 
+       wandb_config is the url of one of your runs. For api, cache & offline, see fetch_wandb_config"""
+    config = fetch_wandb_config(wandb_config, api=api, cache=cache, offline=offline)
+    for key, value in config.items():
         if 'OMITTED' != value: defaults[key] = arg_eval(value)
     return defaults
 
 
 
+def omit_config(args, omit=[]):
+    "dict of args to push to wandb, with 'OMITTED' as the value for keys in omit. (only the dict is new, not the values)"
+    return {key: ('OMITTED' if key in omit else val) for key, val in vars(args).items()}
+
+
 def push_wandb_config(wandb_logger, args, omit=[]): 
     """
     save config to wandb (for possible retrieval later)
     Omit: list of args you don't want pushed to wandb; will push an empty string for these
+    For a version that doesn't wait on the network, see WandbPublisher.push_config
     """
     if hasattr(wandb_logger.experiment.config, 'update'): #On multi-GPU runs, only process rank 0 has this attribute!
-        copy_args = copy.deepcopy(args)
-        for var_str in omit:  # don't push certain reserved settings to wandb
-            if hasattr(copy_args, var_str):
-                setattr(copy_args, var_str, 'OMITTED')
-        wandb_logger.experiment.config.update(copy_args)
+        wandb_logger.experiment.config.update(omit_config(args, omit))  # don't push certain reserved settings to wandb
 
 
-def get_all_args(defaults_file=DEFAULTS_FILE):
-    " Config setup."
+def get_all_args(defaults_file=DEFAULTS_FILE, frozen=False):
+    " Config setup. frozen=True returns read-only FrozenArgs (see frozen.py) instead of an argparse.Namespace"
     args = {}
     #   1. Default settings are in defaults ini (or some other config) file
-    defaults, defaults_text = read_defaults(defaults_file=defaults_file)
-    args = setup_args(defaults, defaults_text=defaults_text)  
+    with metrics.timer('read_defaults'):
+        defaults, defaults_text = read_defaults(defaults_file=defaults_file)
+    with metrics.timer('setup_args_1'):
+        args = setup_args(defaults, defaults_text=defaults_text)  
 
     #   2. if --wandb-config is given, pull config from wandb to override defaults
     if args.wandb_config is not None:
-        defaults = pull_wandb_config(args.wandb_config, defaults) # 2.
+        with metrics.timer('pull_wandb_config'):
+            defaults = pull_wandb_config(args.wandb_config, defaults) # 2.
 
-    #   3. Any new command-line arguments override whatever was set earlier
-    args = setup_args(defaults, defaults_text=defaults_text) # 3. this time cmd-line overrides what's there
+        #   3. Any new command-line arguments override whatever was set earlier
+        with metrics.timer('setup_args_2'):
+            args = setup_args(defaults, defaults_text=defaults_text) # 3. this time cmd-line overrides what's there
+        # (without a wandb pull, the defaults haven't changed, so the args from step 1 already have the cmd-line overrides)
 
 
     #  4. If any of the args are themselves config files, parse them
-    args = parse_imports(args)
-
+    with metrics.timer('parse_imports'):
+        args = parse_imports(args)
+
+    if frozen:
+        from prefigure.frozen import freeze_args
+        sources = import_sources.get(id(args), {})
+        args = freeze_args(args)
+        set_import_sources(args, sources)
     return args
 
 
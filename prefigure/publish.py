@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+__author__ = 'S.H. Hawley'
+
+"""
+Non-blocking pushes to wandb: logs go onto a bounded queue and a worker thread sends them.
+Config updates get merged, in the order they arrive, into one pending dict, and the queue just
+gets a marker saying there's config to send. Whatever piles up between sends is merged, so only
+the latest value per key goes out.
+"""
+
+from prefigure.prefigure import omit_config
+from prefigure.lazy import LazyModule
+import atexit
+import queue
+import threading
+import warnings
+
+wandb = LazyModule('wandb')
+
+
+class WandbPublisher(object):
+    "background thread that pushes config updates & logs to wandb, so the training loop never waits on the network"
+    def __init__(self,
+                 target=None,     # a (lightning) WandbLogger, or a wandb run. None means wandb.run
+                 maxsize=1000,    # max queued items; beyond that, new logs are dropped (and counted). config updates are never dropped
+                 interval=1.0,    # seconds to collect items for before sending them as one batch
+                 ):
+        self.target, self.interval = target, interval
+        self.queue = queue.Queue(maxsize)
+        self.counts = {'queued': 0, 'dropped': 0, 'sent': 0, 'coalesced': 0, 'errors': 0}
+        self.wake, self.closed = threading.Event(), False
+        self.config, self.lock = {}, threading.Lock()   # config updates not sent yet, merged
+        self.config_queued = False                       # whether there's a marker for them in the queue
+        self.thread = threading.Thread(target=self.worker, name='prefigure-publisher', daemon=True)
+        self.thread.start()
+        atexit.register(self.close)   # flush whatever's left on exit
+
+    def put(self, item):
+        "returns False if the queue is full"
+        if self.closed: return True
+        try:
+            self.queue.put_nowait(item)
+            self.counts['queued'] += 1
+            return True
+        except queue.Full:
+            return False
+
+    def put_config(self, values):
+        "merges values into the pending config, in arrival order, so a later value for a key always wins"
+        if self.closed: return
+        with self.lock:
+            if self.config: self.counts['coalesced'] += 1
+            self.config.update(values)
+            needs_marker, self.config_queued = not self.config_queued, True
+        if needs_marker: self.put(('config', None, None))   # (if the queue's full, the next send picks the config up anyway)
+
+    def push_config(self, args, omit=[]):
+        "non-blocking version of push_wandb_config"
+        self.put_config(omit_config(args, omit))
+
+    def update_config(self, changed):
+        "e.g. for the changed dict from OFC.update()"
+        self.put_config(changed)
+
+    def log(self, values, step=None):
+        "non-blocking wandb.log"
+        if not self.put(('log', step, dict(values))): self.counts['dropped'] += 1
+
+    def stats(self):
+        return dict(self.counts, queue_depth=self.queue.qsize())
+
+    def run(self):
+        "the wandb run to send to, or None if there isn't one (yet)"
+        target = self.target if self.target is not None else wandb.run
+        return getattr(target, 'experiment', target)   # lightning's WandbLogger keeps the run in .experiment
+
+    def worker(self):
+        "runs in the publisher thread"
+        while True:
+            batch = [self.queue.get()]
+            if batch[0] is not None: self.wake.wait(self.interval)   # let a few more things pile up
+            self.wake.clear()
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.send([item for item in batch if item is not None])
+            finally:
+                for _ in batch: self.queue.task_done()
+            if None in batch: return
+
+    def send(self, batch):
+        "sends the pending config as one update, and the batch's logs as one log call per step"
+        logs = {}
+        for kind, step, values in batch:
+            if kind == 'log': logs.setdefault(step, {}).update(values)
+        with self.lock:
+            config, self.config, self.config_queued = self.config, {}, False
+        if not (config or logs): return
+        self.counts['coalesced'] += sum(1 for item in batch if item[0] == 'log') - len(logs)
+        try:
+            run = self.run()
+            if run is None:
+                self.counts['dropped'] += len(batch)
+                return
+            if config and hasattr(run.config, 'update'):  # On multi-GPU runs, only process rank 0 has this attribute!
+                run.config.update(config, allow_val_change=True)
+            for step, values in logs.items():
+                if step is None: run.log(values)
+                else: run.log(values, step=step)
+            self.counts['sent'] += len(batch)
+        except Exception as e:
+            self.counts['errors'] += 1
+            warnings.warn(f"WandbPublisher: failed to send to wandb: {e}")
+
+    def flush(self):
+        "blocks until everything queued so far has been sent"
+        self.wake.set()
+        self.queue.join()
+
+    def close(self):
+        "flushes and stops the worker thread"
+        if self.closed: return
+        self.closed = True
+        self.wake.set()
+        self.queue.put(None)
+        self.thread.join()
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+__author__ = 'S.H. Hawley'
+
+"""
+Hyperparameter sweeps: many resolved configs from one defaults file, in one process.
+The defaults file is read & its argparse schema built only once; each point of the
+sweep is just a dict of overrides on top of that.
+"""
+
+from prefigure.prefigure import read_config, build_parser, parse_imports, arg_eval, DEFAULTS_FILE
+from pathlib import Path
+import argparse
+import itertools
+import random
+import json
+import os
+
+
+def sweep_points(sweep, mode='grid', num_samples=None, seed=None):
+    """yields dicts of overrides from sweep, a dict of key: list of values.
+       mode='grid': every combination, 'zip': the i-th value of every list together,
+       'random': num_samples random picks, where a list means choose one, and a (low, high) tuple means uniform in that range"""
+    keys = list(sweep.keys())
+    if mode == 'grid':
+        for combo in itertools.product(*(sweep[k] for k in keys)):
+            yield dict(zip(keys, combo))
+    elif mode == 'zip':
+        if len({len(sweep[k]) for k in keys}) > 1:
+            raise ValueError(f"sweep: zip mode needs value lists of equal length, got { {k: len(sweep[k]) for k in keys} }")
+        for combo in zip(*(sweep[k] for k in keys)):
+            yield dict(zip(keys, combo))
+    elif mode == 'random':
+        if num_samples is None: raise ValueError("sweep: random mode needs num_samples")
+        rng = random.Random(seed)
+        for _ in range(num_samples):
+            yield {k: sample_value(rng, v) for k, v in sweep.items()}
+    else:
+        raise ValueError(f"sweep: unknown mode {mode}. Use 'grid', 'zip' or 'random'")
+
+
+def sample_value(rng, values):
+    "random pick for sweep_points: list = choose one, (low, high) tuple = uniform (int if both are ints)"
+    if isinstance(values, tuple) and len(values) == 2:
+        low, high = values
+        if isinstance(low, int) and isinstance(high, int): return rng.randint(low, high)
+        return rng.uniform(low, high)
+    return rng.choice(values)
+
+
+def read_sweep(sweep):
+    "sweep can be a dict or the name of a config file whose values are lists"
+    if isinstance(sweep, dict): return sweep
+    config, _ = read_config(sweep)
+    return {key: arg_eval(val) for key, val in config.items()}
+
+
+def coerce(value, val_type):
+    "converts sweep values given as strings the way argparse would convert them from the command line"
+    if (not isinstance(value, str)) or (val_type in [None, str]): return value
+    if val_type is Path: return Path(value)
+    return arg_eval(value)
+
+
+def sweep_args(sweep,                        # dict of key: list of values, or config file of same
+               defaults_file=DEFAULTS_FILE,  # parsed only once for the whole sweep
+               mode='grid',                  # 'grid', 'zip' or 'random'; see sweep_points
+               num_samples=None,             # for mode='random'
+               seed=None,                    # for mode='random'
+               argv=None,                    # command-line-style overrides applied to every point, e.g. ['--name','sweep1']
+               imports=True,                 # run parse_imports on each point
+               ):
+    "like get_all_args, but yields one args Namespace per point of the sweep"
+    sweep = read_sweep(sweep)
+    defaults, defaults_text = read_config(defaults_file)
+    parser = build_parser(defaults, defaults_text)
+    base = vars(parser.parse_args(argv if argv is not None else []))
+    base['config_file'] = str(defaults_file)
+    types = {action.dest: action.type for action in parser._actions}
+
+    for point in sweep_points(sweep, mode=mode, num_samples=num_samples, seed=seed):
+        values = dict(base)
+        for key, value in point.items():
+            key = key.replace('-', '_')
+            if key not in values: raise ValueError(f"sweep: {key} is not an arg in {defaults_file}")
+            values[key] = coerce(value, types.get(key))
+        args = argparse.Namespace(**values)
+        if imports: args = parse_imports(args)
+        yield args
+
+
+def ini_value(val):
+    "how to write val into an .ini file so that read_config + arg_eval give it back"
+    text = str(val) if isinstance(val, Path) else repr(val)
+    return text.replace('%', '%%')   # configparser interpolation
+
+
+def write_sweep(args_list, out_dir, fmt='ini', prefix='run'):
+    "writes each args (e.g. from sweep_args) to out_dir/<prefix>-0000.ini (or .json) for a launcher. returns the file names"
+    if fmt not in ['ini', 'json']: raise ValueError(f"write_sweep: unknown format {fmt}")
+    os.makedirs(out_dir, exist_ok=True)
+    filenames = []
+    for i, args in enumerate(args_list):
+        values = {k: v for k, v in vars(args).items() if k not in ['config_file', 'wandb_config']}
+        filename = os.path.join(out_dir, f"{prefix}-{i:04d}.{fmt}")
+        with open(filename, 'w') as f:
+            if fmt == 'json':
+                json.dump(values, f, indent=1, default=str)
+            else:
+                f.write('[DEFAULTS]\n' + ''.join(f"{k} = {ini_value(v)}\n" for k, v in values.items()))
+        filenames.append(filename)
+    return filenames
@@ -0,0 +1,36 @@
+"""benchmarks/bench.py --compare: flagging regressions between two result files"""
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH = os.path.join(ROOT, 'benchmarks', 'bench.py')
+
+
+def write_results(path, results):
+    with open(path, 'w') as f:
+        json.dump({'meta': {}, 'results': results}, f)
+    return str(path)
+
+
+def compare(*argv):
+    return subprocess.run([sys.executable, BENCH, '--compare', *argv], capture_output=True, text=True)
+
+
+def test_regressions_flagged(tmp_path):
+    old = write_results(tmp_path / 'old.json', {'fast': 1e-3, 'slower': 1e-3, 'zero': 0.0, 'gone': 1e-3})
+    new = write_results(tmp_path / 'new.json', {'fast': 0.9e-3, 'slower': 1.5e-3, 'zero': 1e-3, 'added': 1e-3})
+    out = compare(old, new)
+    assert out.returncode == 1
+    flagged = [line.split()[0] for line in out.stdout.splitlines() if 'REGRESSION' in line]
+    assert flagged == ['slower']
+    assert 'not compared' in [l for l in out.stdout.splitlines() if l.startswith('zero')][0]
+    assert '1 regression(s) beyond 20%' in out.stdout
+    assert compare(old, new, '--threshold', '0.6').returncode == 0
+
+
+def test_no_regressions(tmp_path):
+    old = write_results(tmp_path / 'old.json', {'a': 1e-3})
+    new = write_results(tmp_path / 'new.json', {'a': 1.1e-3})
+    assert compare(old, new).returncode == 0
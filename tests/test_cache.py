@@ -0,0 +1,122 @@
+"""DiskCache, and fetching wandb configs through it (with a stand-in for wandb.Api)"""
+import multiprocessing as mp
+import os
+import time
+
+import pytest
+
+from prefigure.cache import DiskCache, LOCK_FILES
+from prefigure.prefigure import fetch_wandb_config, pull_wandb_config
+
+URL = 'https://wandb.ai/me/proj/runs/abc123?workspace=user-me'
+
+
+class StubRun(object):
+    def __init__(self, config): self.config = config
+
+class StubApi(object):
+    "stands in for wandb.Api: counts calls to run()"
+    def __init__(self, config=None, delay=0.0):
+        self.config, self.delay, self.calls = config or {'lr': '0.001', 'bs': 8}, delay, 0
+    def run(self, path):
+        self.calls += 1
+        time.sleep(self.delay)
+        return StubRun(dict(self.config))
+
+
+def test_put_get(tmp_path):
+    cache = DiskCache('t', cache_dir=tmp_path)
+    assert cache.get('a/b/c') is None
+    cache.put('a/b/c', {'x': [1, 2]})
+    assert cache.get('a/b/c') == {'x': [1, 2]}
+
+
+def test_ttl(tmp_path):
+    cache = DiskCache('t', cache_dir=tmp_path, ttl=60)
+    cache.put('k', 1)
+    old = time.time() - 120
+    os.utime(cache.path('k'), (old, old))
+    assert cache.get('k') is None
+    assert cache.get('k', ignore_ttl=True) == 1
+
+
+def test_evict_bounds_entries_and_lock_files(tmp_path):
+    cache = DiskCache('t', cache_dir=tmp_path, max_entries=5)
+    for i in range(200):
+        with cache.lock(f'key{i}'):
+            cache.put(f'key{i}', i)
+    files = os.listdir(cache.dir)
+    assert len([f for f in files if f.endswith('.json')]) == 5
+    assert len(files) <= 5 + LOCK_FILES
+    assert cache.get('key199') == 199
+
+
+def test_unwritable_cache_just_warns(tmp_path):
+    blocker = tmp_path / 'file'
+    blocker.write_text('not a directory')
+    cache = DiskCache('t', cache_dir=blocker)
+    with pytest.warns(UserWarning):
+        cache.put('k', 1)
+    assert cache.get('k') is None
+
+
+def hold_lock(cache_dir, started, seconds):
+    with DiskCache('t', cache_dir=cache_dir).lock('k'):
+        started.set()
+        time.sleep(seconds)
+
+
+def test_lock_excludes_other_processes(tmp_path):
+    ctx = mp.get_context('spawn')
+    started = ctx.Event()
+    p = ctx.Process(target=hold_lock, args=(str(tmp_path), started, 1.0))
+    p.start()
+    assert started.wait(30)
+    start = time.time()
+    with DiskCache('t', cache_dir=tmp_path).lock('k'):
+        waited = time.time() - start
+    p.join(30)
+    assert waited > 0.5
+
+
+def test_fetch_uses_cache(tmp_path):
+    cache, api = DiskCache('wandb', cache_dir=tmp_path), StubApi()
+    assert fetch_wandb_config(URL, api=api, cache=cache, offline=False) == api.config
+    assert fetch_wandb_config(URL, api=api, cache=cache, offline=False) == api.config
+    assert api.calls == 1
+    assert fetch_wandb_config(URL, api=api, cache=False, offline=False) == api.config
+    assert api.calls == 2
+
+
+def test_offline(tmp_path):
+    cache, api = DiskCache('wandb', cache_dir=tmp_path, ttl=1), StubApi()
+    with pytest.raises(ValueError):
+        fetch_wandb_config(URL, api=api, cache=cache, offline=True)   # nothing cached yet
+    fetch_wandb_config(URL, api=api, cache=cache, offline=False)
+    old = time.time() - 100
+    os.utime(cache.path('me/proj/abc123'), (old, old))                   # stale, but offline doesn't care
+    assert fetch_wandb_config(URL, api=api, cache=cache, offline=True) == api.config
+    assert api.calls == 1
+    with pytest.raises(ValueError):
+        fetch_wandb_config(URL, cache=False, offline=True)
+
+
+def test_offline_from_env(tmp_path, monkeypatch):
+    monkeypatch.setenv('WANDB_MODE', 'offline')
+    with pytest.raises(ValueError):
+        fetch_wandb_config(URL, api=StubApi(), cache=DiskCache('wandb', cache_dir=tmp_path))
+
+
+def test_pull_overrides_defaults(tmp_path):
+    api = StubApi({'lr': '0.5', 'bs': 'OMITTED'})
+    defaults = pull_wandb_config(URL, {'lr': 0.1, 'bs': 4}, api=api, cache=DiskCache('wandb', cache_dir=tmp_path), offline=False)
+    assert defaults == {'lr': 0.5, 'bs': 4}
+
+
+def test_concurrent_fetches_share_one_call(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+    cache, api = DiskCache('wandb', cache_dir=tmp_path), StubApi(delay=0.2)
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(lambda _: fetch_wandb_config(URL, api=api, cache=cache, offline=False), range(4)))
+    assert results == [api.config] * 4
+    assert api.calls == 1
@@ -0,0 +1,111 @@
+"""owner/follower sharing of OFC changes via shared memory"""
+import argparse
+import multiprocessing as mp
+import os
+import uuid
+import warnings
+
+import pytest
+
+from prefigure.channel import SharedChannel
+from prefigure.ofc import OFC
+
+
+def channel_name():
+    return 'prefigure-test-' + uuid.uuid4().hex[:12]
+
+
+def test_read_only_returns_new_values():
+    name = channel_name()
+    owner, reader = SharedChannel(name, create=True), SharedChannel(name)
+    try:
+        assert reader.read() is None          # nothing published yet
+        owner.publish({'lr': 0.1})
+        assert reader.read() == {'lr': 0.1}
+        assert reader.read() is None          # already seen
+        owner.publish({'lr': 0.2, 'bs': 8})
+        assert reader.read() == {'lr': 0.2, 'bs': 8}
+    finally:
+        reader.close()
+        owner.close()
+
+
+def test_reader_can_start_before_owner():
+    name = channel_name()
+    reader = SharedChannel(name)
+    assert reader.read() is None
+    owner = SharedChannel(name, create=True)
+    try:
+        owner.publish({'x': 1})
+        assert reader.read() == {'x': 1}
+    finally:
+        reader.close()
+        owner.close()
+
+
+def test_payload_too_big():
+    owner = SharedChannel(channel_name(), create=True, size=128)
+    try:
+        with pytest.raises(ValueError):
+            owner.publish({'big': list(range(1000))})
+    finally:
+        owner.close()
+
+
+def read_in_child(name, queue):
+    queue.put(SharedChannel(name).read())
+
+
+@pytest.mark.parametrize('method', ['fork', 'spawn'])
+def test_other_process_reads(method):
+    if method not in mp.get_all_start_methods(): pytest.skip(f"no {method} here")
+    name = channel_name()
+    owner = SharedChannel(name, create=True)
+    try:
+        owner.publish({'lr': 0.5})
+        ctx = mp.get_context(method)
+        queue = ctx.Queue()
+        p = ctx.Process(target=read_in_child, args=(name, queue))
+        p.start()
+        assert queue.get(timeout=30) == {'lr': 0.5}
+        p.join(timeout=30)
+        assert p.exitcode == 0
+        owner.publish({'lr': 0.6})   # the child detaching mustn't have removed the segment
+    finally:
+        owner.close()
+
+
+def make_args(tmp_path, name, **values):
+    return argparse.Namespace(name=str(tmp_path / name), **values)
+
+
+def test_ofc_follower_gets_owner_changes(tmp_path):
+    name = channel_name()
+    owner_args = make_args(tmp_path, 'owner', lr=0.1, bs=8)
+    follower_args = make_args(tmp_path, 'follower', lr=0.1, bs=8)
+    owner = OFC(owner_args, use_gui=False, steerables=['lr', 'bs'], role='owner', channel_name=name)
+    follower = OFC(follower_args, use_gui=False, steerables=['lr', 'bs'], role='follower', channel_name=name)
+    try:
+        assert follower.update() == {}
+        owner.submit({'lr': '0.3'})
+        assert owner_args.lr == 0.3
+        assert follower.update() == {'lr': 0.3}
+        assert follower_args.lr == 0.3
+        assert follower.update() == {}
+        assert not os.path.exists(follower.ofc_file)   # followers don't touch files
+    finally:
+        follower.close()
+        owner.close()
+
+
+def test_ofc_owner_survives_oversized_changes(tmp_path):
+    args = make_args(tmp_path, 'big', ratios=[1, 2])
+    owner = OFC(args, use_gui=False, steerables=['ratios'], role='owner', channel_name=channel_name(), channel_size=256)
+    try:
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            owner.submit({'ratios': str(list(range(1000)))})
+        assert args.ratios == list(range(1000))   # applied anyway
+        assert any('channel_size' in str(w.message) for w in caught)
+    finally:
+        owner.close()
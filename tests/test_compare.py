@@ -0,0 +1,92 @@
+"""fetch_wandb_configs & ConfigTable, with a stand-in for wandb.Api"""
+import threading
+import time
+
+import pytest
+
+from prefigure.cache import DiskCache
+from prefigure.compare import ConfigTable, MISSING, fetch_wandb_configs, project_path
+
+CONFIGS = {'a1': {'lr': 0.1, 'bs': 8}, 'b2': {'lr': 0.2, 'bs': 8}, 'c3': {'lr': 0.1, 'bs': 8, 'extra': 1}}
+
+
+class StubRun(object):
+    def __init__(self, id, config): self.id, self.config = id, config
+
+class StubApi(object):
+    "stands in for wandb.Api: keeps track of how many run() calls are in flight at once, and can fail a few times"
+    def __init__(self, configs=CONFIGS, delay=0.0, failures=0):
+        self.configs, self.delay, self.failures = configs, delay, failures
+        self.calls, self.in_flight, self.most_in_flight = 0, 0, 0
+        self.lock = threading.Lock()
+    def runs(self, path, filters=None):
+        return [StubRun(id, config) for id, config in self.configs.items()]
+    def run(self, path):
+        with self.lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.most_in_flight = max(self.most_in_flight, self.in_flight)
+            fail = self.failures > 0
+            if fail: self.failures -= 1
+        time.sleep(self.delay)
+        with self.lock: self.in_flight -= 1
+        if fail: raise ConnectionError('flaky')
+        run_id = path.split('/')[-1]
+        if run_id not in self.configs: raise KeyError(run_id)
+        return StubRun(run_id, dict(self.configs[run_id]))
+
+
+def urls(*run_ids):
+    return [f"https://wandb.ai/me/proj/runs/{run_id}" for run_id in run_ids]
+
+
+def test_project_path():
+    assert project_path('me/proj') == 'me/proj'
+    assert project_path('https://wandb.ai/me/proj/') == 'me/proj'
+    with pytest.raises(ValueError):
+        project_path('proj')
+
+
+def test_project_and_diff(tmp_path):
+    table = fetch_wandb_configs('me/proj', api=StubApi(), cache=DiskCache('w', cache_dir=tmp_path), offline=False)
+    assert table.runs == ['a1', 'b2', 'c3']
+    assert table.config('c3') == CONFIGS['c3']
+    assert table.row('extra') == [MISSING, MISSING, 1]
+    assert table.diff().columns == {'lr': {'a1': 0.1, 'b2': 0.2, 'c3': 0.1}, 'extra': {'c3': 1}}
+    assert 'lr' in table.diff().to_text()
+
+
+def test_concurrency_is_bounded(tmp_path):
+    configs = {f'r{i}': {'i': i} for i in range(12)}
+    api = StubApi(configs, delay=0.05)
+    table = fetch_wandb_configs(urls(*configs), api=api, cache=False, offline=False, max_workers=3)
+    assert len(table.runs) == 12 and not table.errors
+    assert 1 < api.most_in_flight <= 3
+
+
+def test_retries_then_errors(tmp_path):
+    api = StubApi(failures=2)
+    table = fetch_wandb_configs(urls('a1'), api=api, cache=False, offline=False, retries=2, backoff=0)
+    assert table.runs == ['a1'] and api.calls == 3
+    table = fetch_wandb_configs(urls('a1', 'nope'), api=StubApi(), cache=False, offline=False, retries=1, backoff=0)
+    assert table.runs == ['a1']
+    assert list(table.errors) == urls('nope')
+
+
+def test_offline(tmp_path, monkeypatch):
+    cache = DiskCache('w', cache_dir=tmp_path)
+    fetch_wandb_configs(urls('a1'), api=StubApi(), cache=cache, offline=False)
+    import prefigure.compare
+    monkeypatch.setattr(prefigure.compare, 'wandb', None)   # offline must never touch wandb
+    table = fetch_wandb_configs(urls('a1', 'b2'), cache=cache, offline=True)
+    assert table.runs == ['a1'] and list(table.errors) == urls('b2')
+    with pytest.raises(ValueError, match='list of run urls'):
+        fetch_wandb_configs('me/proj', cache=cache, offline=True)
+    monkeypatch.setenv('WANDB_MODE', 'offline')
+    with pytest.raises(ValueError, match='list of run urls'):
+        fetch_wandb_configs('me/proj', cache=cache)
+
+
+def test_empty_table():
+    table = ConfigTable({}, [])
+    assert table.diff().columns == {} and repr(table) == 'ConfigTable(0 keys x 0 runs, 0 errors)'
@@ -0,0 +1,92 @@
+"""the headless HTTP control endpoint for OFC"""
+import argparse
+import json
+import os
+import threading
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import pytest
+
+from prefigure.control import ControlClient
+from prefigure.ofc import OFC
+
+
+@pytest.fixture
+def ofc(tmp_path):
+    args = argparse.Namespace(name=str(tmp_path / 'run'), lr=0.1, bs=8, ratios=[4, 2], secret='x')
+    ofc = OFC(args, use_gui=False, steerables=['lr', 'bs', 'ratios'], control_port=0)
+    yield ofc
+    ofc.close()
+
+
+def status_of(fn, *args, **kwargs):
+    with pytest.raises(HTTPError) as e:
+        fn(*args, **kwargs)
+    return e.value.code
+
+
+def test_get(ofc):
+    client = ControlClient(ofc.control_url)
+    assert client.steerables() == {'lr': 0.1, 'bs': 8, 'ratios': [4, 2]}
+    assert client.get('bs') == 8
+    assert status_of(client.get, 'secret') == 404
+    assert status_of(client.request, '/nowhere') == 404
+
+
+def test_set_converts_to_the_args_type(ofc):
+    client = ControlClient(ofc.control_url)
+    assert client.set(lr='5e-5', bs=16) == {'lr': 5e-5, 'bs': 16}
+    assert (ofc.args.lr, ofc.args.bs) == (5e-5, 16)
+    assert client.set(ratios='[8, 8]') == {'ratios': [8, 8]}
+
+
+def test_set_rejects_bad_values(ofc):
+    client = ControlClient(ofc.control_url)
+    assert status_of(client.set, bs='abc') == 400
+    assert status_of(client.set, secret='y') == 400    # not steerable
+    assert status_of(client.request, '/args', [1, 2]) == 400
+    assert (ofc.args.bs, ofc.args.secret) == (8, 'x')
+
+
+def test_bad_json(ofc):
+    request = Request(ofc.control_url + '/args', data=b'{not json', headers={'Content-Type': 'application/json'})
+    with pytest.raises(HTTPError) as e:
+        urlopen(request, timeout=10)
+    assert e.value.code == 400
+    assert 'bad JSON' in json.loads(e.value.read())['error']
+
+
+def test_set_is_seen_by_update(ofc):
+    ControlClient(ofc.control_url).set(lr=0.2)
+    assert ofc.args.lr == 0.2
+    assert ofc.update() == {}    # already applied
+
+
+@pytest.mark.parametrize('journal', [False, True])
+def test_submit_waits_for_the_training_loops_update(tmp_path, journal):
+    args = argparse.Namespace(name=str(tmp_path / 'race'), bs=8)
+    ofc = OFC(args, use_gui=False, steerables=['bs'], journal=journal, control_port=0)
+    inside, go = threading.Event(), threading.Event()
+    read_values = ofc.read_values
+    def slow_read_values():   # the training loop's update() gets stuck half-way through reading
+        if threading.current_thread() is training: 
+            inside.set()
+            go.wait(10)
+        return read_values()
+    ofc.read_values = slow_read_values
+    training = threading.Thread(target=ofc.update)
+    training.start()
+    assert inside.wait(10)
+    submit = threading.Thread(target=ControlClient(ofc.control_url).set, kwargs={'bs': 16})
+    submit.start()
+    submit.join(0.3)
+    assert submit.is_alive()         # the control server's submit waits its turn...
+    go.set()
+    training.join(10)
+    submit.join(10)
+    assert args.bs == 16             # ...then goes through
+    ofc.submit({'bs': 32})
+    assert args.bs == 32
+    if journal: assert ofc.journal.offset == os.path.getsize(ofc.journal.path)
+    ofc.close()
@@ -0,0 +1,72 @@
+"""make_converter: new values get the type of the arg's original value, or a ValueError"""
+import argparse
+import configparser
+from pathlib import Path
+
+import pytest
+
+from prefigure.convert import make_converter
+from prefigure.ofc import OFC
+
+
+def test_bool_before_int():
+    to_bool, to_int = make_converter(False), make_converter(3)
+    assert to_bool('1') is True and to_bool('no') is False and to_bool(0) is False
+    with pytest.raises(ValueError):
+        to_bool('maybe')
+    with pytest.raises(ValueError):
+        to_int(True)
+
+
+def test_int():
+    to_int = make_converter(3)
+    assert to_int('7') == 7 and to_int('1e4') == 10000 and type(to_int('1e4')) is int
+    assert to_int(5.0) == 5
+    for bad in ['1.5', 'abc', 1.5]:
+        with pytest.raises(ValueError):
+            to_int(bad)
+
+
+def test_float_str_path():
+    assert make_converter(0.1)('3') == 3.0
+    with pytest.raises(ValueError):
+        make_converter(0.1)('abc')
+    assert make_converter('name')("'quoted'") == 'quoted'
+    assert make_converter('name')(12) == '12'
+    assert make_converter(Path('a'))('b/c') == Path('b/c')
+
+
+def test_containers():
+    assert make_converter([1, 2])('[3, 4.0]') == [3, 4]          # uniform list: items converted
+    with pytest.raises(ValueError):
+        make_converter([1, 2])('[1, "x"]')
+    assert make_converter([1, 'a'])('[2, 3.5]') == [2, 3.5]      # mixed: items left alone
+    to_tuple = make_converter((1, 2))
+    assert to_tuple('[5, 6]') == (5, 6) and type(to_tuple([5, 6])) is tuple
+    assert make_converter({'a': 1})('{"b": 2}') == {'b': 2}      # JSON works too
+    for bad in ['[1, 2]', 3]:
+        with pytest.raises(ValueError):
+            make_converter({'a': 1})(bad)
+    with pytest.raises(ValueError):
+        make_converter([1])('not a list')
+
+
+def test_none_template_falls_back_to_arg_eval():
+    to_any = make_converter(None)
+    assert to_any('5') == 5 and to_any('[1]') == [1] and to_any('hello') == 'hello'
+
+
+def test_ofc_ignores_wrong_type_edit(tmp_path):
+    args = argparse.Namespace(name=str(tmp_path / 'run'), lr=0.1, bs=8)
+    ofc = OFC(args, use_gui=False, steerables=['lr', 'bs'])
+    config = configparser.ConfigParser()
+    config.read(ofc.ofc_file)
+    config['OFC']['bs'], config['OFC']['lr'] = 'abc', '0.5'
+    with open(ofc.ofc_file, 'w') as f:
+        config.write(f)
+    with pytest.warns(UserWarning, match='bs'):
+        assert ofc.update() == {'lr': 0.5}
+    assert args.bs == 8
+    with pytest.raises(ValueError):
+        ofc.submit({'bs': 'abc'})
+    ofc.close()
@@ -0,0 +1,108 @@
+"""FrozenArgs: read-only args that pickle by file path once saved"""
+import argparse
+import json
+import pickle
+import sys
+
+import pytest
+
+from prefigure.frozen import FrozenArgs, FrozenDict, FrozenList, freeze_args, load_frozen_args
+from prefigure.ofc import OFC
+from prefigure.prefigure import get_all_args, schema_cache
+
+
+def make_args():
+    return freeze_args(argparse.Namespace(name='run', lr=0.1, ratios=[4, 2], model={'depth': 4, 'layers': [{'w': 1}]}))
+
+
+def test_reads_like_a_namespace():
+    args = make_args()
+    assert args.lr == 0.1 and args.ratios == [4, 2] and 'lr' in args
+    assert vars(args)['model'] == {'depth': 4, 'layers': [{'w': 1}]}
+    assert json.loads(json.dumps(vars(args)))['ratios'] == [4, 2]
+    assert args == argparse.Namespace(**vars(args).copy())
+    with pytest.raises(AttributeError):
+        args.nope
+
+
+def test_read_only_at_any_depth():
+    args = make_args()
+    with pytest.raises(AttributeError):
+        args.lr = 0.2
+    with pytest.raises(AttributeError):
+        del args.lr
+    for change in [lambda: args.model.update(depth=5), lambda: args.model.__setitem__('depth', 5),
+                   lambda: args.ratios.append(3), lambda: args.ratios.__setitem__(0, 1), lambda: args.ratios.sort(),
+                   lambda: args.model['layers'][0].pop('w'), lambda: vars(args).__setitem__('lr', 1)]:
+        with pytest.raises(TypeError):
+            change()
+    assert isinstance(args.ratios, FrozenList) and isinstance(args.model['layers'][0], FrozenDict)
+
+
+def test_replace_shares_the_rest():
+    args = make_args()
+    args2 = args.replace(lr=0.5, ratios=[1])
+    assert (args.lr, args2.lr) == (0.1, 0.5)
+    assert args2.model is args.model
+    assert isinstance(args2.ratios, FrozenList)
+
+
+def test_to_namespace_is_plain_and_mutable():
+    ns = make_args().to_namespace()
+    ns.ratios.append(3)
+    ns.model['layers'][0]['w'] = 2
+    assert type(ns.model) is dict and type(ns.ratios) is list
+
+
+def test_pickle_without_save_sends_values():
+    args = make_args()
+    data = pickle.dumps(args)
+    assert b'depth' in data
+    assert pickle.loads(data) == args
+
+
+def test_pickle_after_save_sends_only_the_path(tmp_path):
+    args = make_args().replace(blob='x' * 10000)
+    args.save(tmp_path / 'args.pkl')
+    data = pickle.dumps(args)
+    assert len(data) < 1000
+    copy = pickle.loads(data)
+    assert copy == args and pickle.loads(data) is copy     # loaded once per process
+
+
+def test_overwritten_file_sends_values(tmp_path):
+    path = tmp_path / 'args.pkl'
+    args = make_args().save(path)
+    args.replace(lr=9.0).save(path)        # same size, maybe the same mtime
+    assert pickle.loads(pickle.dumps(args)).lr == 0.1
+
+
+def test_file_overwritten_in_flight(tmp_path):
+    path = tmp_path / 'args.pkl'
+    data = pickle.dumps(make_args().save(path))
+    make_args().replace(lr=9.0).save(path)
+    with pytest.raises(ValueError, match='overwritten'):
+        pickle.loads(data)
+    assert load_frozen_args(path).lr == 9.0
+
+
+def test_get_all_args_frozen(tmp_path, monkeypatch):
+    monkeypatch.setattr(schema_cache, 'dir', str(tmp_path / 'cache'))
+    (tmp_path / 'model.json').write_text('{"depth": 4}')
+    defaults = tmp_path / 'defaults.ini'
+    defaults.write_text(f"[DEFAULTS]\nname = test\nlr = 0.1\nimports = model\nmodel = {tmp_path / 'model.json'}\n")
+    monkeypatch.setattr(sys, 'argv', ['train.py', '--config-file', str(defaults), '--lr', '0.3'])
+    args = get_all_args(frozen=True)
+    assert isinstance(args, FrozenArgs) and args.lr == 0.3 and args.model == {'depth': 4}
+    assert isinstance(args.model, FrozenDict)
+
+
+def test_ofc_replaces_frozen_args(tmp_path):
+    args = freeze_args({'name': str(tmp_path / 'run'), 'lr': 0.1, 'ratios': [4, 2]})
+    ofc = OFC(args, use_gui=False, steerables=['lr', 'ratios'])
+    assert ofc.update() == {}
+    ofc.submit({'lr': '0.5', 'ratios': '[8, 8]'})
+    assert args.lr == 0.1                              # the old args don't change...
+    assert ofc.args.lr == 0.5 and ofc.args.ratios == [8, 8]   # ...ofc.args get replaced
+    assert isinstance(ofc.args, FrozenArgs) and isinstance(ofc.args.ratios, FrozenList)
+    ofc.close()
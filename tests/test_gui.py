@@ -0,0 +1,31 @@
+"""building & submitting the OFC gui's values, without gradio itself"""
+import argparse
+import os
+
+from prefigure.journal import Journal
+from prefigure.ofc import OFC
+
+
+def make_ofc(tmp_path, n=1000, **kwargs):
+    args = argparse.Namespace(name=str(tmp_path / 'run'), **{f'arg{i}': i for i in range(n)})
+    return args, OFC(args, use_gui=False, steerables=['arg1', 'arg2', 'arg500', 'missing'], **kwargs)
+
+
+def test_pages_only_hold_steerables(tmp_path):
+    _, ofc = make_ofc(tmp_path)
+    assert ofc.steerable_keys() == ['arg1', 'arg2', 'arg500']
+    assert ofc.page_keys(page_size=2) == ['arg1', 'arg2']
+    assert ofc.page_keys(page=1, page_size=2) == ['arg500']
+    assert ofc.page_keys(query='50', page_size=2) == ['arg500']
+
+
+def test_gui_submit_appends_only_the_changes(tmp_path):
+    args, ofc = make_ofc(tmp_path, journal=True)
+    ofc.args_gui_dict.update({'arg1': '1', 'arg2': '2'})   # what the gui is showing
+    mtime = os.stat(ofc.ofc_file).st_mtime_ns
+    ofc.submit_gui_values(['arg1', 'arg2'], ['1', '20'])
+    assert args.arg2 == 20
+    assert [(r['key'], r['value']) for r in Journal(ofc.journal.path).read_new()] == [('arg2', 20)]
+    assert os.stat(ofc.ofc_file).st_mtime_ns == mtime    # no whole-file rewrite
+    ofc.submit_gui_values(['arg1', 'arg2'], ['1', '20'])  # nothing new
+    assert ofc.appended == 1
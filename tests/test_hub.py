@@ -0,0 +1,110 @@
+"""OFCHub: one control surface for the runs registered in a directory, editing them through their journals"""
+import argparse
+import json
+import subprocess
+import sys
+from urllib.error import HTTPError
+
+import pytest
+
+from prefigure.control import ControlClient
+from prefigure.hub import OFCHub
+from prefigure.ofc import OFC
+
+
+@pytest.fixture
+def hub(tmp_path):
+    hub = OFCHub(str(tmp_path / 'runs'))
+    yield hub
+    hub.close()
+
+
+def make_run(tmp_path, **kwargs):
+    (tmp_path / 'my').mkdir(exist_ok=True)
+    args = argparse.Namespace(name='my/run', lr=0.1, bs=8)   # (a '/' in the name, as wandb-style names can have)
+    ofc = OFC(args, use_gui=False, steerables=['lr', 'bs'], registry_dir=str(tmp_path / 'runs'), **kwargs)
+    return args, ofc
+
+
+def test_runs_and_edits(tmp_path, hub, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    args, ofc = make_run(tmp_path)
+    assert list(ControlClient(hub.url).request('/runs')) == ['my_run']
+    client = ControlClient(hub.url + '/runs/my_run')
+    assert client.steerables() == {'lr': 0.1, 'bs': 8}
+    assert client.set(bs='16') == {'bs': 16}
+    assert ofc.update() == {'bs': 16} and args.bs == 16
+    assert client.get('bs') == 16
+    with pytest.raises(HTTPError) as e:
+        client.set(lr='abc')
+    assert e.value.code == 400
+    ofc.close()
+
+
+def test_schedule_shows_up_in_hub(tmp_path, hub, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    args, ofc = make_run(tmp_path, schedule=[(10, 'lr', 0.01)])
+    client = ControlClient(hub.url + '/runs/my_run')
+    client.set(lr=0.5)
+    ofc.update(step=5)
+    assert args.lr == 0.5
+    ofc.update(step=10)
+    assert args.lr == 0.01
+    assert client.get('lr') == 0.01      # not the hub's older 0.5
+    assert client.set(lr=0.5) == {'lr': 0.5}
+    assert ofc.update(step=11) == {'lr': 0.5} and args.lr == 0.5
+    ofc.close()
+
+
+def test_restarted_run_gets_a_fresh_reader(tmp_path, hub, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    args, ofc = make_run(tmp_path)
+    client = ControlClient(hub.url + '/runs/my_run')
+    client.set(bs=16)
+    ofc.update()
+    ofc.close()
+    args, ofc = make_run(tmp_path)          # same name, so same registry file & journal path
+    assert client.steerables() == {'lr': 0.1, 'bs': 8}
+    assert client.set(bs=16) == {'bs': 16}
+    assert ofc.update() == {'bs': 16} and args.bs == 16
+    ofc.close()
+
+
+def test_finished_runs_drop_off(tmp_path, hub, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    args, ofc = make_run(tmp_path)
+    dead = subprocess.Popen([sys.executable, '-c', 'pass'])
+    dead.wait()
+    (tmp_path / 'runs' / 'old.json').write_text(json.dumps({'pid': dead.pid, 'journal': 'x', 'values': {}}))
+    (tmp_path / 'runs' / 'junk.json').write_text('{half a fi')
+    assert list(ControlClient(hub.url).request('/runs')) == ['my_run']
+    ofc.close()
+    assert ControlClient(hub.url).request('/runs') == {}
+
+
+def test_page_and_404s(tmp_path, hub, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    args, ofc = make_run(tmp_path)
+    status, page = hub.handle('GET', '/', None)
+    assert status == 200 and 'my_run' in page and 'bs' in page
+    assert hub.handle('GET', '/runs/nope/steerables', None)[0] == 404
+    assert hub.handle('GET', '/runs/my_run/args/secret', None)[0] == 404
+    assert hub.handle('POST', '/runs/my_run/args', [1])[0] == 400
+    assert hub.handle('POST', '/runs/my_run/args', {'name': 'x'})[0] == 400   # not steerable
+    ofc.close()
+
+
+def test_hub_compacts_the_journal(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    hub = OFCHub(str(tmp_path / 'runs'), compact_every=3)
+    try:
+        args, ofc = make_run(tmp_path)
+        client = ControlClient(hub.url + '/runs/my_run')
+        for bs in [16, 32, 64]: client.set(bs=bs)
+        assert ofc.journal.read_snapshot()['values']['bs'] == 64
+        assert ofc.update() == {'bs': 64}
+        client.set(lr=0.5)
+        assert client.steerables() == {'lr': 0.5, 'bs': 64}
+        ofc.close()
+    finally:
+        hub.close()
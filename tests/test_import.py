@@ -0,0 +1,23 @@
+"""`import prefigure` must stay cheap: heavy modules only get imported when they're actually used"""
+import os
+import subprocess
+import sys
+
+from prefigure.lazy import HEAVY_MODULES
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def imported_by(code):
+    "modules (of HEAVY_MODULES) in sys.modules after running code in a fresh interpreter"
+    check = f"{code}\nimport sys\nprint(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    out = subprocess.run([sys.executable, '-c', check], cwd=REPO_DIR, capture_output=True, text=True, check=True)
+    return [m for m in out.stdout.strip().split(',') if m]
+
+
+def test_import_prefigure_is_not_eager():
+    assert imported_by('import prefigure') == []
+
+
+def test_get_all_args_import_is_not_eager():
+    assert imported_by('from prefigure import get_all_args, OFC, WandbPublisher, sweep_args') == []
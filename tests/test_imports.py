@@ -0,0 +1,74 @@
+"""parse_imports: nested imports, caching, and every parse getting its own dicts"""
+import argparse
+import json
+import os
+
+import pytest
+
+from prefigure.prefigure import parse_imports, imported_files, import_cache
+
+
+def write_json(path, obj):
+    "writes obj, making sure the file's mtime moves on, even on coarse-grained filesystems"
+    old = os.stat(path).st_mtime_ns if os.path.exists(path) else 0
+    with open(path, 'w') as f:
+        json.dump(obj, f)
+    os.utime(path, ns=(old + 10**9, old + 10**9))
+
+
+def parse(**values):
+    return parse_imports(argparse.Namespace(imports=','.join(values), **{k: str(v) for k, v in values.items()}))
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    import_cache.clear()
+
+
+def test_import_replaces_filename(tmp_path):
+    write_json(tmp_path / 'model.json', {'depth': 4})
+    args = parse(model=tmp_path / 'model.json')
+    assert args.model == {'depth': 4}
+
+
+def test_nested_import_relative_to_importing_file(tmp_path):
+    (tmp_path / 'sub').mkdir()
+    write_json(tmp_path / 'sub' / 'child.json', {'x': 1})
+    write_json(tmp_path / 'sub' / 'parent.json', {'imports': 'child', 'child': 'child.json', 'y': 2})
+    args = parse(parent=tmp_path / 'sub' / 'parent.json')
+    assert args.parent['child'] == {'x': 1}
+    assert imported_files(args) == {'parent': str(tmp_path / 'sub' / 'parent.json'),
+                                    'parent.child': str(tmp_path / 'sub' / 'child.json')}
+
+
+def test_changed_nested_import_is_reread(tmp_path):
+    write_json(tmp_path / 'child.json', {'x': 1})
+    write_json(tmp_path / 'parent.json', {'imports': 'child', 'child': str(tmp_path / 'child.json')})
+    assert parse(parent=tmp_path / 'parent.json').parent['child'] == {'x': 1}
+    write_json(tmp_path / 'child.json', {'x': 2})
+    assert parse(parent=tmp_path / 'parent.json').parent['child'] == {'x': 2}
+
+
+def test_each_parse_gets_its_own_dicts(tmp_path):
+    write_json(tmp_path / 'model.json', {'a': 1, 'layers': [1, 2], 'sub': {'b': 2}})
+    first = parse(model=tmp_path / 'model.json')
+    first.model['a'] = 99
+    first.model['layers'].append(3)
+    first.model['sub']['b'] = 99
+    second = parse(model=tmp_path / 'model.json')
+    assert second.model == {'a': 1, 'layers': [1, 2], 'sub': {'b': 2}}
+
+
+def test_same_file_under_two_keys(tmp_path):
+    write_json(tmp_path / 'c.json', {'a': 1})
+    args = parse(one=tmp_path / 'c.json', two=tmp_path / 'c.json')
+    assert args.one == args.two == {'a': 1}
+    args.one['a'] = 2
+    assert args.two['a'] == 1
+
+
+def test_circular_import(tmp_path):
+    write_json(tmp_path / 'a.json', {'imports': 'b', 'b': str(tmp_path / 'b.json')})
+    write_json(tmp_path / 'b.json', {'imports': 'a', 'a': str(tmp_path / 'a.json')})
+    with pytest.raises(ValueError, match='Circular'):
+        parse(a=tmp_path / 'a.json')
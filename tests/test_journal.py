@@ -0,0 +1,103 @@
+"""the append-only journal of OFC changes, on its own and in OFC(journal=True)"""
+import argparse
+import configparser
+import json
+
+from prefigure.journal import Journal
+from prefigure.ofc import OFC
+
+
+def test_reader_only_gets_new_records(tmp_path):
+    writer, reader = Journal(str(tmp_path / 'j')), Journal(str(tmp_path / 'j'))
+    assert reader.read_new() == []
+    writer.append({'lr': 0.1, 'bs': 8}, step=5)
+    records = reader.read_new()
+    assert [(r['key'], r['value'], r['step']) for r in records] == [('lr', 0.1, 5), ('bs', 8, 5)]
+    assert [r['seq'] for r in records] == [1, 2]
+    assert reader.read_new() == []
+
+
+def test_two_writers_share_one_sequence(tmp_path):
+    a, b, reader = (Journal(str(tmp_path / 'j')) for _ in range(3))
+    a.append({'x': 1})
+    b.append({'x': 2})
+    a.append({'y': 3})
+    assert [(r['seq'], r['value']) for r in reader.read_new()] == [(1, 1), (2, 2), (3, 3)]
+
+
+def test_reader_replays_snapshot_after_compaction(tmp_path):
+    writer, reader = Journal(str(tmp_path / 'j')), Journal(str(tmp_path / 'j'))
+    writer.append({'x': 1})
+    writer.compact({'x': 1})
+    writer.append({'y': 2})
+    late = Journal(str(tmp_path / 'j'))    # never saw the records that got compacted
+    assert {r['key']: r['value'] for r in late.read_new()} == {'x': 1, 'y': 2}
+    assert {r['key']: r['value'] for r in reader.read_new()} == {'x': 1, 'y': 2}
+
+
+def test_partial_last_line_waits(tmp_path):
+    path = tmp_path / 'j'
+    reader = Journal(str(path))
+    Journal(str(path)).append({'x': 1})
+    with open(path, 'a') as f:
+        f.write(json.dumps({'seq': 2, 'time': 0, 'step': None, 'key': 'y', 'value': 2})[:10])   # mid-write
+    assert [r['key'] for r in reader.read_new()] == ['x']
+
+
+def make_ofc(tmp_path, **kwargs):
+    args = argparse.Namespace(name=str(tmp_path / 'run'), lr=0.1, bs=8)
+    return args, OFC(args, use_gui=False, steerables=['lr', 'bs'], journal=True, **kwargs)
+
+
+def test_ofc_submit_records_step(tmp_path):
+    args, ofc = make_ofc(tmp_path)
+    ofc.update(step=100)
+    ofc.submit({'lr': '0.5'})
+    assert args.lr == 0.5
+    records = Journal(ofc.journal.path).read_new()
+    assert [(r['key'], r['value'], r['step']) for r in records] == [('lr', 0.5, 100)]
+
+
+def test_ofc_compacts_and_exports(tmp_path):
+    args, ofc = make_ofc(tmp_path, compact_every=3)
+    for bs in [16, 32, 64]:
+        ofc.submit({'bs': bs})
+    assert ofc.journal.read_snapshot()['values'] == {'bs': 64}
+    config = configparser.ConfigParser()
+    config.read(ofc.ofc_file)
+    assert config['OFC']['bs'] == '64'
+
+    ofc.submit({'lr': 0.01})
+    ofc.export()
+    config.read(ofc.ofc_file)
+    assert config['OFC']['lr'] == '0.01'
+
+
+def test_compact_keeps_other_writers_records(tmp_path):
+    args, ofc = make_ofc(tmp_path)
+    ofc.update()
+    Journal(ofc.journal.path).append({'lr': 0.5})    # e.g. the hub, after this reader last looked
+    ofc.compact()
+    assert ofc.journal.read_snapshot()['values'] == {'lr': 0.5}
+    assert ofc.update() == {'lr': 0.5} and args.lr == 0.5
+
+
+def test_compact_keeps_other_writers_snapshot(tmp_path):
+    path = str(tmp_path / 'j')
+    mine, other = Journal(path), Journal(path)
+    mine.append({'x': 1})
+    mine.read_new()
+    other.append({'y': 2})
+    other.compact({'y': 2})      # folds x in too, as it hadn't read it
+    mine.compact({'x': 1})       # hasn't seen other's snapshot
+    assert mine.read_snapshot()['values'] == {'x': 1, 'y': 2}
+    assert {r['key']: r['value'] for r in mine.read_new()} == {'x': 1, 'y': 2}
+
+
+def test_new_run_starts_fresh(tmp_path):
+    args, ofc = make_ofc(tmp_path)
+    ofc.submit({'bs': 16})
+    ofc.close()
+    args, ofc = make_ofc(tmp_path)    # same journal path
+    assert ofc.journal.read_snapshot()['values'] == {}
+    assert ofc.update() == {} and args.bs == 8
@@ -0,0 +1,39 @@
+"""opt-in timing metrics, and OFC's submit-to-update latency"""
+import argparse
+import time
+
+import pytest
+
+from prefigure.instrument import metrics
+from prefigure.ofc import OFC
+
+
+@pytest.fixture
+def latencies():
+    recorded = []
+    hook = lambda name, seconds: recorded.append(seconds) if name == 'ofc_latency' else None
+    metrics.enable()
+    metrics.add_hook(hook)
+    yield recorded
+    metrics.hooks.remove(hook)
+    metrics.enable(False)
+    metrics.reset()
+
+
+def test_disabled_records_nothing():
+    metrics.record('x', 1.0)
+    with metrics.timer('y'): pass
+    assert metrics.dump() == '\n'
+
+
+@pytest.mark.parametrize('journal', [False, True])
+def test_no_op_submit_doesnt_start_a_latency(tmp_path, latencies, journal):
+    args = argparse.Namespace(name=str(tmp_path / 'run'), lr=0.1)
+    ofc = OFC(args, use_gui=False, steerables=['lr'], journal=journal)
+    ofc.submit({'lr': '0.1'})       # same value: nothing written
+    assert ofc.submitted_at is None
+    time.sleep(0.2)
+    ofc.submit({'lr': 0.5})
+    assert args.lr == 0.5
+    assert len(latencies) == 1 and latencies[0] < 0.2   # not counted from the no-op submit
+    ofc.close()
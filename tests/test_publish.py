@@ -0,0 +1,86 @@
+"""WandbPublisher, sending to a stand-in for a wandb run"""
+import argparse
+import threading
+import time
+
+from prefigure.publish import WandbPublisher
+
+
+class StubConfig(object):
+    def __init__(self, delay=0.0, gate=None):
+        self.updates, self.delay, self.gate = [], delay, gate
+    def update(self, values, allow_val_change=False):
+        if self.gate is not None: self.gate.wait(10)
+        time.sleep(self.delay)
+        self.updates.append(dict(values))
+
+class StubRun(object):
+    def __init__(self, **kwargs):
+        self.config, self.logs = StubConfig(**kwargs), []
+    def log(self, values, step=None):
+        self.logs.append((step, dict(values)))
+
+
+def latest(run):
+    "the config as wandb would have it after all the updates"
+    config = {}
+    for update in run.config.updates: config.update(update)
+    return config
+
+
+def test_config_and_logs_get_sent():
+    run = StubRun()
+    publisher = WandbPublisher(run, interval=0.01)
+    publisher.push_config(argparse.Namespace(lr=0.1, secret='x'), omit=['secret'])
+    publisher.log({'loss': 1.0}, step=1)
+    publisher.log({'acc': 0.5}, step=1)
+    publisher.close()
+    assert latest(run) == {'lr': 0.1, 'secret': 'OMITTED'}
+    assert run.logs == [(1, {'loss': 1.0, 'acc': 0.5})]
+
+
+def test_latest_config_value_wins_when_queue_is_full():
+    gate = threading.Event()
+    run = StubRun(gate=gate)
+    publisher = WandbPublisher(run, maxsize=3, interval=0.3)
+    publisher.update_config({'lr': 1})      # the worker sends this, and blocks in config.update
+    time.sleep(0.5)
+    for i in range(3): publisher.log({'i': i})
+    publisher.update_config({'lr': 9})      # the queue is full
+    gate.set()
+    time.sleep(0.1)                         # the worker has taken one log off the queue, and waits for more
+    publisher.update_config({'lr': 10})     # fits in the queue now
+    publisher.close()
+    assert latest(run)['lr'] == 10
+    assert run.config.updates[-1] == {'lr': 10}
+
+
+def test_logs_beyond_maxsize_get_dropped():
+    gate = threading.Event()
+    run = StubRun(gate=gate)
+    publisher = WandbPublisher(run, maxsize=2, interval=0)
+    publisher.update_config({'lr': 1})
+    time.sleep(0.1)
+    for i in range(5): publisher.log({'i': i}, step=i)
+    assert publisher.stats()['dropped'] == 3
+    gate.set()
+    publisher.close()
+    assert [step for step, _ in run.logs] == [0, 1]
+
+
+def test_flush_waits_for_sends():
+    run = StubRun(delay=0.05)
+    publisher = WandbPublisher(run, interval=10)
+    publisher.update_config({'a': 1})
+    publisher.flush()
+    assert latest(run) == {'a': 1}
+    publisher.close()
+
+
+def test_no_run_counts_as_dropped():
+    class NoRun(object):
+        experiment = None
+    publisher = WandbPublisher(NoRun(), interval=0)
+    publisher.log({'x': 1})
+    publisher.close()
+    assert publisher.stats()['dropped'] == 1
@@ -0,0 +1,101 @@
+"""OFC(watch_imports=True): re-reading imported config files, in the owner and the watcher thread, shared with followers"""
+import argparse
+import time
+import uuid
+
+import pytest
+
+from prefigure.ofc import OFC
+from prefigure.prefigure import parse_imports, import_cache
+from test_imports import write_json
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    import_cache.clear()
+
+
+def make_args(tmp_path, name):
+    args = argparse.Namespace(name=str(tmp_path / name), imports='model', model=str(tmp_path / 'model.json'), lr=0.1)
+    return parse_imports(args)
+
+
+def test_off_by_default(tmp_path):
+    write_json(tmp_path / 'model.json', {'depth': 4})
+    args = make_args(tmp_path, 'run')
+    ofc = OFC(args, use_gui=False, steerables=['lr'])
+    write_json(tmp_path / 'model.json', {'depth': 12})
+    assert ofc.update() == {} and args.model == {'depth': 4}
+    ofc.close()
+
+
+def test_reload_applies_dotted_changes(tmp_path):
+    write_json(tmp_path / 'model.json', {'depth': 4, 'width': 64})
+    args = make_args(tmp_path, 'run')
+    ofc = OFC(args, use_gui=False, steerables=['lr'], watch_imports=True)
+    seen = []
+    ofc.on_change('model.depth', lambda key, val: seen.append(val))
+    assert ofc.update() == {}
+    write_json(tmp_path / 'model.json', {'depth': 12, 'width': 64})
+    assert ofc.update() == {'model.depth': 12}
+    assert args.model == {'depth': 12, 'width': 64} and seen == [12]
+    assert ofc.update() == {}
+    ofc.close()
+
+
+def test_watcher_thread_does_the_reading(tmp_path):
+    write_json(tmp_path / 'model.json', {'depth': 4})
+    args = make_args(tmp_path, 'run')
+    ofc = OFC(args, use_gui=False, steerables=['lr'], watch_imports=True, watch_interval=0.05)
+    try:
+        write_json(tmp_path / 'model.json', {'depth': 12})
+        deadline = time.time() + 10
+        while not ofc.pending_imports and time.time() < deadline: time.sleep(0.02)
+        assert args.model == {'depth': 4}                  # the thread doesn't touch args...
+        assert ofc.update() == {'model.depth': 12}         # ...update() applies what it read
+        assert args.model == {'depth': 12}
+    finally:
+        ofc.close()
+
+
+def test_follower_gets_dotted_changes_from_owner(tmp_path):
+    name = 'prefigure-test-' + uuid.uuid4().hex[:12]
+    write_json(tmp_path / 'model.json', {'depth': 4})
+    owner_args, follower_args = make_args(tmp_path, 'owner'), make_args(tmp_path, 'follower')
+    owner = OFC(owner_args, use_gui=False, steerables=['lr'], role='owner', channel_name=name, watch_imports=True)
+    follower = OFC(follower_args, use_gui=False, steerables=['lr'], role='follower', channel_name=name, watch_imports=True)
+    try:
+        assert follower.imports == {}                      # only the owner watches the files
+        write_json(tmp_path / 'model.json', {'depth': 12})
+        owner.submit({'lr': 0.2})
+        assert owner_args.model == {'depth': 12}
+        assert follower.update() == {'lr': 0.2, 'model.depth': 12}
+        assert follower_args.model == {'depth': 12} and follower_args.lr == 0.2
+        assert follower.update() == {}
+        owner.submit({'lr': 0.3})                          # re-publishes everything so far
+        assert follower.update() == {'lr': 0.3}
+    finally:
+        follower.close()
+        owner.close()
+
+
+def test_broken_file_is_retried_only_when_it_changes(tmp_path, monkeypatch):
+    import prefigure.ofc
+    write_json(tmp_path / 'model.json', {'depth': 4})
+    args = make_args(tmp_path, 'run')
+    ofc = OFC(args, use_gui=False, steerables=['lr'], watch_imports=True)
+    assert ofc.check_imports() == []
+    calls = []
+    load_config = prefigure.ofc.load_config
+    monkeypatch.setattr(prefigure.ofc, 'load_config', lambda path: calls.append(path) or load_config(path))
+    (tmp_path / 'model.json').write_text('{"depth": ')        # half-written
+    with pytest.warns(UserWarning, match="couldn't reload"):
+        assert ofc.update() == {}
+    for _ in range(10): assert ofc.update() == {}
+    assert len(calls) == 1 and args.model == {'depth': 4}
+    write_json(tmp_path / 'model.json', {'depth': 4})         # back as it was: still worth a re-read
+    assert ofc.update() == {}
+    write_json(tmp_path / 'model.json', {'depth': 8})
+    assert ofc.update() == {'model.depth': 8}
+    assert len(calls) == 3
+    ofc.close()
@@ -0,0 +1,75 @@
+"""the cached schema that setup_args builds its parser from: help strings, types & defaults, and the disk cache"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from prefigure.prefigure import read_help, compile_schema, schema_default, build_parser, arg_eval, schema_cache, SCHEMA_TYPES
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TEXT = ['[DEFAULTS]\n', '# learning rate\n', 'lr = 0.1\n', '\n', '# gradient clipping\n', 'clr_max = 1\n',
+        'no_comment = 2\n', '; semicolon comment\n', 'batch_size: 8\n']
+
+
+def test_help_goes_with_the_key_below_it():
+    helps = read_help(TEXT)
+    assert helps['lr'] == 'learning rate'           # a substring match would pick clr_max's comment
+    assert helps['clr_max'] == 'gradient clipping'
+    assert helps['no_comment'] == ''
+    assert helps['batch_size'] == 'semicolon comment'
+    assert 'DEFAULTS' not in helps
+
+
+def test_help_in_parser(tmp_path, monkeypatch):
+    monkeypatch.setattr(schema_cache, 'dir', str(tmp_path))   # keep the test's schema out of ~/.cache
+    p = build_parser({'lr': '0.1', 'clr_max': '1'}, TEXT)
+    assert p._option_string_actions['--lr'].help == 'learning rate'
+    assert p._option_string_actions['--clr-max'].help == 'gradient clipping'
+
+
+VALUES = {'str': 'hello', 'int': '3', 'float': '0.5', 'complex': '(1+2j)', 'bool': 'True', 'list': '[1, 2]',
+          'tuple': '(1, 2)', 'dict': "{'a': [1]}", 'set': '{1, 2}', 'bytes': "b'x'", 'NoneType': 'None',
+          'Path': 'data_dir/train'}
+
+def test_every_schema_type_round_trips():
+    assert set(VALUES) == set(SCHEMA_TYPES)
+    schema = compile_schema({f'x_{name}': value for name, value in VALUES.items()})
+    for key, type_name, default, help in schema:
+        name = key[2:]
+        assert type_name == name
+        expected = Path(VALUES[name]) if name == 'Path' else arg_eval(VALUES[name])
+        restored = schema_default(type_name, default)
+        assert restored == expected and type(restored) is type(expected)
+
+
+def test_stops_at_wandb_config():
+    schema = compile_schema({'a': '1', 'wandb_config': 'x', 'b': '2'})
+    assert [row[0] for row in schema] == ['a']
+
+
+SCRIPT = '''
+import sys
+import prefigure.prefigure as pp
+defaults, text = pp.read_config(sys.argv[1])
+hit = pp.schema_cache.get(pp.config_hash(defaults, text)) is not None
+p = pp.build_parser(defaults, text)
+print(hit, p.get_default('lr'))
+'''
+
+def build_in_new_process(config_file, cache_dir):
+    env = dict(os.environ, PREFIGURE_CACHE_DIR=str(cache_dir), PYTHONPATH=ROOT)
+    out = subprocess.run([sys.executable, '-c', SCRIPT, str(config_file)], env=env, capture_output=True, text=True, check=True)
+    return out.stdout.split()
+
+
+def test_disk_cache_hit_and_miss(tmp_path):
+    config_file = tmp_path / 'defaults.ini'
+    config_file.write_text('[DEFAULTS]\n# learning rate\nlr = 0.1\n')
+    assert build_in_new_process(config_file, tmp_path / 'cache') == ['False', '0.1']   # miss: compiled & stored
+    assert build_in_new_process(config_file, tmp_path / 'cache') == ['True', '0.1']    # hit, in a fresh process
+    config_file.write_text('[DEFAULTS]\n# learning rate\nlr = 0.2\n')
+    assert build_in_new_process(config_file, tmp_path / 'cache') == ['False', '0.2']   # new contents, new key
+    assert len(os.listdir(tmp_path / 'cache' / 'schema')) >= 2
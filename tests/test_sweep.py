@@ -0,0 +1,71 @@
+"""sweep_args, sweep_points & write_sweep"""
+import sys
+from pathlib import Path
+
+import pytest
+
+from prefigure.prefigure import get_all_args, schema_cache
+from prefigure.sweep import sweep_points, sweep_args, write_sweep
+
+
+@pytest.fixture
+def defaults_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(schema_cache, 'dir', str(tmp_path / 'cache'))   # keep the test's schemas out of ~/.cache
+    path = tmp_path / 'defaults.ini'
+    path.write_text("[DEFAULTS]\nname = test\nlr = 0.1\nbs = 8\nratios = [4, 2]\ndata_dir = data_dir/x\nmode = 'fast'\n")
+    return path
+
+
+def test_counts():
+    sweep = {'lr': [0.1, 0.2, 0.3], 'bs': [8, 16]}
+    assert len(list(sweep_points(sweep))) == 6
+    assert list(sweep_points({'lr': [0.1, 0.2], 'bs': [8, 16]}, mode='zip')) == [{'lr': 0.1, 'bs': 8}, {'lr': 0.2, 'bs': 16}]
+    assert len(list(sweep_points(sweep, mode='random', num_samples=5))) == 5
+
+
+def test_random_with_seed_is_deterministic():
+    sweep = {'lr': (1e-5, 1e-3), 'bs': (8, 64), 'act': ['relu', 'gelu']}
+    first = list(sweep_points(sweep, mode='random', num_samples=10, seed=1))
+    assert first == list(sweep_points(sweep, mode='random', num_samples=10, seed=1))
+    assert first != list(sweep_points(sweep, mode='random', num_samples=10, seed=2))
+    for point in first:
+        assert 1e-5 <= point['lr'] <= 1e-3 and isinstance(point['bs'], int) and point['act'] in ['relu', 'gelu']
+
+
+def test_bad_sweeps():
+    with pytest.raises(ValueError, match='equal length'):
+        list(sweep_points({'lr': [0.1, 0.2], 'bs': [8]}, mode='zip'))
+    with pytest.raises(ValueError):
+        list(sweep_points({'lr': [0.1]}, mode='random'))   # no num_samples
+    with pytest.raises(ValueError):
+        list(sweep_points({'lr': [0.1]}, mode='diagonal'))
+
+
+def test_unknown_key(defaults_file):
+    with pytest.raises(ValueError, match='not an arg'):
+        list(sweep_args({'nope': [1]}, defaults_file=defaults_file))
+
+
+def test_strings_are_coerced_like_the_cli(defaults_file):
+    points = list(sweep_args({'lr': ['0.5'], 'ratios': ['[8, 8]'], 'data-dir': ['other_dir'], 'mode': ['slow']},
+                             defaults_file=defaults_file, argv=['--bs', '32']))
+    args = points[0]
+    assert args.lr == 0.5 and args.ratios == [8, 8] and args.data_dir == Path('other_dir')
+    assert args.mode == 'slow' and args.bs == 32
+
+
+@pytest.mark.parametrize('fmt', ['ini', 'json'])
+def test_written_sweep_reads_back(tmp_path, defaults_file, monkeypatch, fmt):
+    points = list(sweep_args({'lr': [0.01, 0.02], 'ratios': [[1], [2, 3]]}, defaults_file=defaults_file, mode='zip'))
+    filenames = write_sweep(points, tmp_path / 'out', fmt=fmt)
+    assert len(filenames) == 2 and filenames[1].endswith(f'run-0001.{fmt}')
+    for args, filename in zip(points, filenames):
+        monkeypatch.setattr(sys, 'argv', ['train.py', '--config-file', filename])
+        read_back = vars(get_all_args())
+        assert {k: v for k, v in read_back.items() if k != 'config_file'} == \
+               {k: v for k, v in vars(args).items() if k != 'config_file'}
+
+
+def test_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        write_sweep([], tmp_path, fmt='yaml')
@@ -0,0 +1,73 @@
+"""OFC(watch=True) & watch_interval: only re-parsing ofc_file when os.stat says it changed"""
+import argparse
+import configparser
+import os
+import time
+
+from prefigure.ofc import OFC, FileWatcher
+
+
+def edit(path, **values):
+    "changes values in an OFC file the way a person would, making sure its mtime moves on"
+    config = configparser.ConfigParser()
+    config.read(path)
+    for key, val in values.items(): config['OFC'][key] = str(val)
+    old = os.stat(path).st_mtime_ns
+    with open(path, 'w') as f:
+        config.write(f)
+    os.utime(path, ns=(old + 10**9, old + 10**9))
+
+
+def make_ofc(tmp_path, **kwargs):
+    args = argparse.Namespace(name=str(tmp_path / 'run'), lr=0.1, bs=8)
+    return args, OFC(args, use_gui=False, steerables=['lr', 'bs'], **kwargs)
+
+
+def test_file_watcher(tmp_path):
+    path = tmp_path / 'f'
+    watcher = FileWatcher(str(path))
+    assert not watcher.changed()      # missing counts as unchanged
+    path.write_text('x')
+    assert watcher.changed()
+    assert not watcher.changed()
+    path.write_text('xy')
+    assert watcher.changed()
+
+
+def test_watch_skips_unchanged_file(tmp_path):
+    args, ofc = make_ofc(tmp_path, watch=True)
+    reads = []
+    read = ofc.read
+    ofc.read = lambda: reads.append(1) or read()
+    ofc.update()                      # first check reads
+    for _ in range(5): assert ofc.update() == {}
+    assert len(reads) == 1
+    edit(ofc.ofc_file, lr=0.5)
+    assert ofc.update() == {'lr': 0.5} and args.lr == 0.5
+    assert len(reads) == 2
+
+
+def test_watch_interval_queues_changes_and_fires_callbacks(tmp_path):
+    args, ofc = make_ofc(tmp_path, watch_interval=0.05)
+    seen = []
+    ofc.on_change('bs', lambda key, val: seen.append((key, val)))
+    try:
+        edit(ofc.ofc_file, bs=32)
+        deadline = time.time() + 10
+        while not seen and time.time() < deadline: time.sleep(0.02)
+        assert seen == [('bs', 32)]             # fired in the watcher thread...
+        assert args.bs == 8                     # ...but args only change in update()
+        assert ofc.update() == {'bs': 32} and args.bs == 32
+        assert ofc.update() == {}
+    finally:
+        ofc.close()
+
+
+def test_stop_watching_joins_thread(tmp_path):
+    _, ofc = make_ofc(tmp_path, watch_interval=0.05)
+    thread = ofc.watch_thread
+    assert thread.is_alive()
+    ofc.stop_watching()
+    assert ofc.watch_thread is None and not thread.is_alive()
+    ofc.stop_watching()               # twice is fine
+    ofc.close()